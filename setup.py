@@ -1,8 +1,13 @@
+import re
+
 from setuptools import setup
 
+# The version is defined only in yajwiz/__init__.py, because the dictionary snapshot and the analyzer state cache depend on it
+version = re.search(r'^__version__ = "(.*)"', open("yajwiz/__init__.py").read(), re.M).group(1)
+
 setup(
     name="yajwiz",
-    version="0.10.4",
+    version=version,
     author="Iikka Hauhio",
     author_email="fergusq@kaivos.org",
     packages=["yajwiz"],
@@ -1,3 +1,9 @@
-from .analyzer import tokenize, split_to_morphemes, analyze, split_to_letters, split_to_syllables, get_errors
+__version__ = "0.10.4"
+
+from .analyzer import tokenize, split_to_morphemes, analyze, split_to_letters, split_to_syllables, get_errors, warmup, set_analysis_cache_size, analysis_cache_info, clear_analysis_cache
 from .boqwiz import load_dictionary, update_dictionary, BoqwizDictionary, BoqwizEntry
-from .pos_tagger import conllu_to_tagged_list, Tagger, text_to_conllu
+from .grammar_rules import load_rule_pack
+from .profiling import enable_profiling, disable_profiling, profiling_report
+from .pos_tagger import conllu_to_tagged_list, iter_tagged_sentences, Tagger, text_to_conllu, text_to_conllu_sentences, train_tagger
+from .doc import Doc
+from .session import DocumentSession
@@ -1,13 +1,20 @@
 import re
 from collections import defaultdict
-import copy
+import functools
+import hashlib
+import threading
+import time
 
 from typing import DefaultDict, Dict, List, NamedTuple, Set, Tuple, Optional, Literal, TypedDict
-from yajwiz.grammar_rules import proofread_tokens
-from yajwiz.boqwiz import BoqwizEntry, load_dictionary
+from yajwiz.grammar_rules import GRAMMAR_RULES, GrammarRule, proofread_tokens
+from yajwiz.boqwiz import DATA_DIR, BoqwizDictionary, BoqwizEntry, load_dictionary, _load_snapshot, _save_snapshot
 
-from .tables import LOCATIVE_NOUNS, SUFFIX_TYPES, UNIVERSAL_FEATURES, XPOS_TO_UPOS, PREFIX_TABLE, Person, Number
-from .types import ProofreaderError, Token, TokenType, Xpos, Analysis, SyntaxInfo
+from . import __version__
+
+from . import morphology, profiling
+from .syntax import syntax_bits, syntax_info
+from .tables import SUFFIX_TYPES, UNIVERSAL_FEATURES, XPOS_TO_UPOS, PREFIX_TABLE
+from .types import CompactAnalysis, ProofreaderError, Token, TokenType, Xpos, Analysis
 
 def _get_xpos(entry: BoqwizEntry) -> Xpos:
     pos2 = entry.tags
@@ -56,7 +63,7 @@ def _get_xpos(entry: BoqwizEntry) -> Xpos:
     else:
         return "UNK"
 
-dictionary = load_dictionary()
+dictionary: Optional[BoqwizDictionary] = None
 
 VERBS: List[str] = []
 STATIVE_VERBS: List[str] = ["lo'laH", "lo'laHbe'"]
@@ -70,98 +77,212 @@ ALL_WORDS: Set[str] = set()
 WORD_INDEX: DefaultDict[str, List[BoqwizEntry]] = defaultdict(lambda: [])
 XPOS_INDEX: DefaultDict[str, Set[str]] = defaultdict(set)
 
-for boqwiz_id in dictionary.entries:
-    entry = dictionary.entries[boqwiz_id]
-    word = entry.name
-    pos = entry.tags
-    if "hyp" in pos:
-        continue
-
-    very_bad = "pref" in pos or "suff" in pos
+def _build_indexes():
+    for boqwiz_id in dictionary.entries:
+        entry = dictionary.entries[boqwiz_id]
+        word = entry.name
+        pos = entry.tags
+        if "hyp" in pos:
+            continue
 
-    if "v" in pos:
-        good = not very_bad and word not in DERIV_VERBS and word not in DERIV_STATIVE_VERBS and not "deriv" in pos
-        if good:
-            VERBS.append(word)
-        
-        elif not very_bad:
-            DERIV_VERBS.append(word)
+        very_bad = "pref" in pos or "suff" in pos
 
-        WORD_INDEX[word + ":v"].append(entry)
-    
-        if "is" in pos:
+        if "v" in pos:
+            good = not very_bad and word not in DERIV_VERBS and word not in DERIV_STATIVE_VERBS and not "deriv" in pos
             if good:
-                STATIVE_VERBS.append(word)
+                VERBS.append(word)
             
             elif not very_bad:
-                DERIV_STATIVE_VERBS.append(word)
-    
-    elif "n" in pos:
-        if not very_bad and word not in DERIV_NOUNS:
-            NOUNS.append(word)
+                DERIV_VERBS.append(word)
+
+            WORD_INDEX[word + ":v"].append(entry)
         
-        elif not very_bad:
-            DERIV_NOUNS.append(word)
+            if "is" in pos:
+                if good:
+                    STATIVE_VERBS.append(word)
+                
+                elif not very_bad:
+                    DERIV_STATIVE_VERBS.append(word)
+        
+        elif "n" in pos:
+            if not very_bad and word not in DERIV_NOUNS:
+                NOUNS.append(word)
+            
+            elif not very_bad:
+                DERIV_NOUNS.append(word)
 
-        WORD_INDEX[word + ":n"].append(entry)
-    
-    else:
-        WORD_INDEX[word + ":other"].append(entry)
-    
-    ALL_WORDS.add(word)
-    XPOS_INDEX[_get_xpos(entry)].add(word)
+            WORD_INDEX[word + ":n"].append(entry)
+        
+        else:
+            WORD_INDEX[word + ":other"].append(entry)
+        
+        ALL_WORDS.add(word)
+        XPOS_INDEX[_get_xpos(entry)].add(word)
 
-# Match longer first
-VERBS.sort(key=lambda i: -len(i))
-STATIVE_VERBS.sort(key=lambda i: -len(i))
-NOUNS.sort(key=lambda i: -len(i))
+    # Match longer first
+    VERBS.sort(key=lambda i: -len(i))
+    STATIVE_VERBS.sort(key=lambda i: -len(i))
+    NOUNS.sort(key=lambda i: -len(i))
 
 NOUN_SUFFIX_REGEX = r"('a'|Hom|(?<=[bDHjqlmnpQrStvwy'hg])oy|(?<![bDHjqlmnpQrStvwy'hg])'oy)?(pu'|Du'|mey)?(qoq|Hey|na')?(wI'|ma'|lI'|ra'|wIj|maj|lIj|raj|Daj|chaj|vam|vetlh)?(Daq|vo'|mo'|vaD|'e')?"
 
-NOUN_REGEX = re.compile(r"")
-
 VERB_SUFFIX_REGEX = r"(Ha')?(be'|qu')?('egh|chuq)?(be'|qu')?(nIS|qang|rup|beH|vIp)?(be'|qu')?(choH|qa')?(be'|qu')?(moH)?(be'|qu')?(lu'|laH)?(be'|qu')?(chu'|bej|ba'|law')?(be'|qu')?(pu'|ta'|taH|lI')?(be'|qu')?(neS)?(be'|qu')?(Qo')?(?:(DI'|chugh|pa'|vIS|mo'|bogh|meH|'a'|jaj)|(?:(wI'|ghach)" + NOUN_SUFFIX_REGEX + r"))?"
 
-VERB_REGEX = re.compile(r"")
+VERB_PREFIX_REGEX = r"(|HI|gho|yI|tI|pe|qa|Sa|vI|jI|pI|re|DI|wI|ma|cho|ju|Da|bI|tu|che|bo|Su|mu|nu|Du|lI|nI|lu)"
 
 PRONOUN_VERB_REGEX = re.compile(r"(jIH|maH|SoH|tlhIH|ghaH|chaH|'oH|bIH)" + VERB_SUFFIX_REGEX)
 
-STATIVE_VERB_REGEX = re.compile(r"")
+STATIVE_VERB_SUFFIX_REGEX = r"(Ha')?(be')?(qu')?(be')?(Daq|vo'|mo'|vaD|'e')"
 
 NUMBER_SUFFIX_REGEX = r"(maH|vatlh|SaD|SanID|netlh|bIp|'uy'|Saghan|maH'uy'|vatlhbIp|vatlh'uy'|SaDbIp|SanIDbIp)"
 NUMBER_REGEX = re.compile(r"(wa'|cha'|wej|loS|vagh|jav|Soch|chorgh|Hut)(?:" + NUMBER_SUFFIX_REGEX +  r"(DIch|logh|leS|Hu')?|" + NUMBER_SUFFIX_REGEX + r"?(DIch|logh|leS|Hu'))")
 
+PRONOUN_VERB_MATCHER = morphology.pronoun_verb_matcher()
+NUMBER_MATCHER = morphology.number_matcher()
+
+def _create_matchers():
+    global NOUN_MATCHER, VERB_MATCHER, STATIVE_VERB_MATCHER
+
+    NOUN_MATCHER = morphology.noun_matcher(NOUNS)
+    VERB_MATCHER = morphology.verb_matcher(VERBS)
+    STATIVE_VERB_MATCHER = morphology.stative_verb_matcher(STATIVE_VERBS)
+
+# The lemma regexes are not used by the analyzer anymore, they are kept for reference and for testing the matchers
+
 def _create_regexes():
     global NOUN_REGEX, VERB_REGEX, STATIVE_VERB_REGEX
 
     NOUN_REGEX = re.compile(r"(" + r"|".join(NOUNS) + r")" + NOUN_SUFFIX_REGEX)
 
-    VERB_REGEX = re.compile(r"(|HI|gho|yI|tI|pe|qa|Sa|vI|jI|pI|re|DI|wI|ma|cho|ju|Da|bI|tu|che|bo|Su|mu|nu|Du|lI|nI|lu)("
+    VERB_REGEX = re.compile(VERB_PREFIX_REGEX + r"("
         + r"|".join(VERBS)
         + r")" + VERB_SUFFIX_REGEX)
 
-    STATIVE_VERB_REGEX = re.compile(r"(" + r"|".join(STATIVE_VERBS) + r")(Ha')?(be')?(qu')?(be')?(Daq|vo'|mo'|vaD|'e')")
+    STATIVE_VERB_REGEX = re.compile(r"(" + r"|".join(STATIVE_VERBS) + r")" + STATIVE_VERB_SUFFIX_REGEX)
+
+def __getattr__(name: str):
+    if name in {"NOUN_REGEX", "VERB_REGEX", "STATIVE_VERB_REGEX"}:
+        warmup()
+        _create_regexes()
+        return globals()[name]
 
-# Find derived words that don't mess with parsing and add them to the regexes
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Find derived words that don't mess with parsing and add them to the matchers
 
 def _add_if_does_not_match(derived: List[str], all: List[str]):
     for word in derived:
-        if not any(regex.fullmatch(word) for regex in [NOUN_REGEX, STATIVE_VERB_REGEX, NUMBER_REGEX, PRONOUN_VERB_REGEX, VERB_REGEX]):
+        if not any(matcher.fullmatch(word) for matcher in [NOUN_MATCHER, STATIVE_VERB_MATCHER, NUMBER_MATCHER, PRONOUN_VERB_MATCHER, VERB_MATCHER]):
             all.append(word)
 
-_create_regexes() # Create regexes for the first time
-_add_if_does_not_match(DERIV_VERBS, VERBS)
-_add_if_does_not_match(DERIV_STATIVE_VERBS, STATIVE_VERBS)
-_add_if_does_not_match(DERIV_NOUNS, NOUNS)
-_create_regexes() # Create regexes for the second time with the additional words
+# The derived state is cached on disk, because finding the derived words is slow
+
+STATE_CACHE_PATH = DATA_DIR / "analyzer.pickle"
+STATE_CACHE_FORMAT = 1
+
+_WORD_LISTS = {
+    "VERBS": VERBS,
+    "STATIVE_VERBS": STATIVE_VERBS,
+    "NOUNS": NOUNS,
+    "DERIV_VERBS": DERIV_VERBS,
+    "DERIV_STATIVE_VERBS": DERIV_STATIVE_VERBS,
+    "DERIV_NOUNS": DERIV_NOUNS,
+}
+
+def _state_cache_key() -> dict:
+    tables = hashlib.sha256()
+    for table in [
+        _WORD_LISTS,
+        NOUN_SUFFIX_REGEX,
+        VERB_PREFIX_REGEX,
+        VERB_SUFFIX_REGEX,
+        STATIVE_VERB_SUFFIX_REGEX,
+        PRONOUN_VERB_REGEX.pattern,
+        NUMBER_REGEX.pattern,
+        SUFFIX_TYPES,
+        PREFIX_TABLE,
+    ]:
+        tables.update(repr(table).encode("utf-8"))
+
+    return {
+        "format": STATE_CACHE_FORMAT,
+        "yajwiz": __version__,
+        "dictionary": dictionary.version,
+        "tables": tables.hexdigest(),
+    }
+
+def _save_state(key: dict):
+    state = {
+        "words": {name: list(words) for name, words in _WORD_LISTS.items()},
+        "all_words": ALL_WORDS,
+        "word_index": {key: [entry.id for entry in entries] for key, entries in WORD_INDEX.items()},
+        "xpos_index": dict(XPOS_INDEX),
+    }
+    _save_snapshot(STATE_CACHE_PATH, key, state)
+
+def _load_state(key: dict) -> bool:
+    snapshot = _load_snapshot(STATE_CACHE_PATH, key)
+    if not snapshot:
+        return False
+
+    state = snapshot[1]
+    try:
+        word_index = {key: [dictionary.entries[i] for i in ids] for key, ids in state["word_index"].items()}
+    
+    except KeyError:
+        return False
+
+    for name, words in _WORD_LISTS.items():
+        words[:] = state["words"][name]
+
+    ALL_WORDS.clear()
+    ALL_WORDS.update(state["all_words"])
+    WORD_INDEX.clear()
+    WORD_INDEX.update(word_index)
+    XPOS_INDEX.clear()
+    XPOS_INDEX.update(state["xpos_index"])
+    return True
+
+_initialized = False
+_initialization_lock = threading.Lock()
+
+def _initialize():
+    global dictionary, _initialized
+    with _initialization_lock:
+        if _initialized:
+            return
+
+        dictionary = load_dictionary()
+        key = _state_cache_key()
+        if not _load_state(key):
+            _build_indexes()
+            _create_matchers() # Create matchers for the first time
+            _add_if_does_not_match(DERIV_VERBS, VERBS)
+            _add_if_does_not_match(DERIV_STATIVE_VERBS, STATIVE_VERBS)
+            _add_if_does_not_match(DERIV_NOUNS, NOUNS)
+            _save_state(key)
+
+        _create_matchers() # Create matchers for the second time with the additional words
+        _initialized = True
+
+def warmup():
+    """
+    Loads the dictionary and builds the analyzer state.
+
+    The state is otherwise built lazily when a word is analyzed for the first time.
+    Long-running processes can call this function at startup to pay the cost up front.
+    """
+    if not _initialized:
+        _initialize()
 
 def split_to_morphemes(word: str) -> Set[tuple]:
     """
     Given a word, splits it to morphemes. Prefixes and suffixes are marked with dashes.
     """
+    warmup()
     ans = set()
-    for regex in [NOUN_REGEX, STATIVE_VERB_REGEX, NUMBER_REGEX, PRONOUN_VERB_REGEX]:
-        if m := regex.fullmatch(word):
+    for matcher in [NOUN_MATCHER, STATIVE_VERB_MATCHER, NUMBER_MATCHER, PRONOUN_VERB_MATCHER]:
+        if m := matcher.fullmatch(word):
             parts = []
             for i, part in enumerate(m.groups()):
                 if not part:
@@ -174,7 +295,7 @@ def split_to_morphemes(word: str) -> Set[tuple]:
             
             ans.add(tuple(parts))
     
-    if m := VERB_REGEX.fullmatch(word):
+    if m := VERB_MATCHER.fullmatch(word):
         parts = []
         for i, part in enumerate(m.groups()):
             if not part:
@@ -241,21 +362,52 @@ def split_to_syllables(word: str) -> List[str]:
     
     return syllables
 
-def _analyze_word_with_pos(ans: List[Analysis], start_pos: str, regex: re.Pattern, lemma_idx: int, word: str, infl_pos:str=None, lemma_pred=lambda l: True):
-    if m := regex.fullmatch(word):
+# Partial analyses share their common beginnings: parts and suffixes are stored as immutable linked lists of
+# (item, previous) pairs, and a dict is built only once for each complete analysis.
+
+Chain = Optional[Tuple[object, "Chain"]]
+
+def _unchain(chain: Chain) -> list:
+    items = []
+    while chain is not None:
+        item, chain = chain
+        items.append(item)
+    
+    items.reverse()
+    return items
+
+def _analyze_word_with_pos(ans: List[Analysis], start_pos: str, matcher: morphology.Matcher, lemma_idx: int, word: str, infl_pos:str=None, lemma_pred=lambda l: True):
+    if m := matcher.fullmatch(word):
         parsed = list(m.groups())
-        def rec(i: int, pos: str, obj: Analysis):
-            rovers = []
+        def rec(i: int, pos: str, parts: Chain, suffixes: Chain, prefix: Optional[str], lemma: str, lemma_entry: Optional[BoqwizEntry]):
             if i >= len(parsed):
-                return [obj]
+                obj: Analysis = {
+                    "WORD": word,
+                    "POS": start_pos.upper(),
+                    "XPOS": _get_xpos(lemma_entry) if lemma_entry else "UNK",
+                    "BOQWIZ_POS": lemma_entry.part_of_speech if lemma_entry else "?",
+                    "BOQWIZ_ID": lemma_entry.id if lemma_entry else "?",
+                    "PARTS": _unchain(parts),
+                    "LEMMA": lemma,
+                }
+                if prefix is not None:
+                    obj["PREFIX"] = prefix
+
+                if suffixes is not None:
+                    obj["SUFFIX"] = dict(_unchain(suffixes))
+
+                ans.append(obj)
+                return
 
             part = parsed[i]
             if not part:
-                return rec(i + 1, pos, obj)
+                rec(i + 1, pos, parts, suffixes, prefix, lemma, lemma_entry)
+                return
 
+            rover = None
             if i < lemma_idx:
                 part = part + "-"
-                obj["PREFIX"] = part
+                prefix = part
 
             elif i > lemma_idx:
                 part = "-" + part
@@ -263,18 +415,18 @@ def _analyze_word_with_pos(ans: List[Analysis], start_pos: str, regex: re.Patter
                 if pos == "v" and part in {"-Daq", "-vo'", "-mo'", "-vaD", "-'e'"}:
                     pos = "n"
 
-                if "SUFFIX" not in obj:
-                    obj["SUFFIX"] = {}
-                
-                obj["SUFFIX"][SUFFIX_TYPES[(part, pos)]] = part
+                suffix_type = SUFFIX_TYPES[(part, pos)]
                 j, m = _next_morphem(parsed, i)
                 if m in {"be'", "qu'"}:
-                    obj["SUFFIX"][SUFFIX_TYPES[(part, pos)]] += m
+                    suffixes = ((suffix_type, part + m), suffixes)
                     i = j
-                    rovers.append(f"-{m}:v")
+                    rover = f"-{m}:v"
+                
+                else:
+                    suffixes = ((suffix_type, part), suffixes)
             
             else:
-                obj["LEMMA"] = part
+                lemma = part
 
             new_pos = pos
 
@@ -284,45 +436,30 @@ def _analyze_word_with_pos(ans: List[Analysis], start_pos: str, regex: re.Patter
             if i == lemma_idx and infl_pos:
                 new_pos = infl_pos
             
-            if (part + ":" + pos) in WORD_INDEX:
-                objs = []
-                for entry in WORD_INDEX[part + ":" + pos]:
-                    new_obj = copy.deepcopy(obj)
-                    new_obj["PARTS"].append(entry.id)
-                    new_obj["PARTS"] += rovers
-                    if i == lemma_idx:
-                        #new_obj["BOQWIZ"] = entry
-
-                        new_obj["XPOS"] = _get_xpos(entry)
-                        new_obj["BOQWIZ_POS"] = entry.part_of_speech
-                        new_obj["BOQWIZ_ID"] = entry.id
+            entries = WORD_INDEX.get(part + ":" + pos)
+            if entries is not None:
+                for entry in entries:
+                    new_parts = (entry.id, parts)
+                    if rover:
+                        new_parts = (rover, new_parts)
 
+                    if i == lemma_idx:
                         if not lemma_pred(entry):
                             continue
+
+                        rec(i + 1, new_pos, new_parts, suffixes, prefix, lemma, entry)
                     
-                    objs += rec(i + 1, new_pos, new_obj)
-                
-                return objs
+                    else:
+                        rec(i + 1, new_pos, new_parts, suffixes, prefix, lemma, lemma_entry)
             
             else:
-                obj["PARTS"].append(part)
-                obj["PARTS"] += rovers
+                new_parts = (part, parts)
+                if rover:
+                    new_parts = (rover, new_parts)
             
-                return rec(i + 1, new_pos, obj)
-        
-        start_obj: Analysis = {
-            "WORD": word,
-            "POS": start_pos.upper(),
-            "XPOS": "UNK",
-            "BOQWIZ_POS": "?",
-            "BOQWIZ_ID": "?",
-            "PARTS": [],
-            "LEMMA": "",
-        }
-
-        objs = rec(0, start_pos, start_obj)
-        
-        ans += objs
+                rec(i + 1, new_pos, new_parts, suffixes, prefix, lemma, lemma_entry)
+
+        rec(0, start_pos, None, None, None, "", None)
 
 GENDERED_SUFFIXES = {
     "being": {
@@ -336,10 +473,13 @@ GENDERED_SUFFIXES = {
     "other": set(),
 }
 
-def analyze(word: str, include_syntactical_info=False, noun_drv_as_noun=False) -> List[Analysis]:
+def analyze(word: str, include_syntactical_info=False, noun_drv_as_noun=False, frozen=False) -> List[Analysis]:
     """
     Given a word, returns a list of possible analyses.
 
+    The analyses are cached (see `set_analysis_cache_size`). By default each call returns fresh copies that the caller may modify.
+    If `frozen` is true, the shared cached analyses are returned as is: they are read-only `CompactAnalysis` objects that support the same keys as the dicts.
+
     Each analysis has:
     - WORD: the analysed word itself
     - LEMMA: the base form of the word, without any affixes
@@ -350,15 +490,23 @@ def analyze(word: str, include_syntactical_info=False, noun_drv_as_noun=False) -
     - PREFIX: (optional) the prefix of the word
     - SUFFIX: (optional) a dict where key is the suffix type (like V7) and values is the suffix (like `-ta'be'`). Rovers are included in their preceding suffixes
     """
+    warmup()
+    analyses = _analyze_cached(word, bool(include_syntactical_info), bool(noun_drv_as_noun))
+    if frozen:
+        return list(analyses)
+    
+    return [analysis.to_dict() for analysis in analyses]
+
+def _analyze(word: str, include_syntactical_info: bool, noun_drv_as_noun: bool) -> List[Analysis]:
     ans: List[Analysis] = []
     
-    _analyze_word_with_pos(ans, "n", NOUN_REGEX, 0, word)
-    _analyze_word_with_pos(ans, "n", NUMBER_REGEX, 0, word)
+    _analyze_word_with_pos(ans, "n", NOUN_MATCHER, 0, word)
+    _analyze_word_with_pos(ans, "n", NUMBER_MATCHER, 0, word)
     if not ans or len(ans[0]["PARTS"]) > 1:
-        _analyze_word_with_pos(ans, "n", PRONOUN_VERB_REGEX, 0, word, infl_pos="v", lemma_pred=lambda e: "pro" in e.tags)
+        _analyze_word_with_pos(ans, "n", PRONOUN_VERB_MATCHER, 0, word, infl_pos="v", lemma_pred=lambda e: "pro" in e.tags)
 
-    _analyze_word_with_pos(ans, "v", VERB_REGEX, 1, word)
-    _analyze_word_with_pos(ans, "v", STATIVE_VERB_REGEX, 0, word, lemma_pred=lambda e: "is" in e.tags)
+    _analyze_word_with_pos(ans, "v", VERB_MATCHER, 1, word)
+    _analyze_word_with_pos(ans, "v", STATIVE_VERB_MATCHER, 0, word, lemma_pred=lambda e: "is" in e.tags)
 
     if word + ":other" in WORD_INDEX:
         for entry in WORD_INDEX[word + ":other"]:
@@ -418,119 +566,61 @@ def analyze(word: str, include_syntactical_info=False, noun_drv_as_noun=False) -
         
         # Add extra information regarding the words rule in the syntax
         if include_syntactical_info:
-            bits = {analysis["XPOS"], analysis["POS"], f"«{analysis['WORD']}»"}
-            info: SyntaxInfo = {}
+            info = syntax_info(analysis)
+            info["BITS"] = syntax_bits(analysis, info)
             analysis["SYNTAX_INFO"] = info
-            if analysis["POS"] == "N":
-                info["ROLE"] = "NP"
-            
-            elif analysis["POS"] == "V" and analysis.get("SUFFIX", {}).get("V9", None) in {"-wI'", "-ghach"}:
-                info["ROLE"] = "NP"
-            
-            elif analysis["POS"] == "V":
-                info["ROLE"] = "VP"
-            
-            else:
-                info["ROLE"] = "OTHER"
-            
-            bits |= {info["ROLE"]}
-            
-            if info["ROLE"] == "VP":
-                voice = "NP" if "-lu':v" in analysis["PARTS"] else "P"
-                subj_person: Set[Person]
-                subj_number: Optional[Number]
-                obj_person: Set[Person]
-                obj_number: Optional[Number]
-                if "PREFIX" in analysis or voice == "NP":
-                    if (analysis.get("PREFIX", "-"), voice) not in PREFIX_TABLE: # ungrammatical word
-                        subj_person = set()
-                        subj_number = None
-                        obj_person = set()
-                        obj_number = None
-                    
-                    else:
-                        subj_person, subj_number, obj_person, obj_number = PREFIX_TABLE[(analysis.get("PREFIX", "-"), voice)]
-                
-                elif analysis["XPOS"] in {"VS", "VI"} and "-moH:v" not in analysis["PARTS"]:
-                    subj_person = {3}
-                    subj_number = None
-                    obj_person = {0}
-                    obj_number = None
 
-                else:
-                    subj_person = {3}
-                    subj_number = None
-                    obj_person = {0, 3}
-                    obj_number = None
-                
-                info["SUBJECT_PERSON"] = subj_person
-                info["SUBJECT_NUMBER"] = subj_number
-                info["OBJECT_PERSON"] = obj_person
-                info["OBJECT_NUMBER"] = obj_number
-
-                for person in subj_person:
-                    bits |= {f"Subj{person}{subj_number or ''}", f"Subj{person}"}
-                    if subj_number:
-                        bits |= {f"Subj{subj_number}"}
-
-                for person in obj_person:
-                    bits |= {f"Obj{person}{obj_number or ''}", f"Obj{person}"}
-                    if obj_number:
-                        bits |= {f"Obj{obj_number}"}
-                
-                if "tu':v" in analysis["PARTS"] and "-lu':v" in analysis["PARTS"]:
-                    bits |= {f"tu'lu':v"}
-                    if analysis.get("PREFIX", "-") == "-":
-                        bits |= {"ObjPlur", "Obj3Plur"}
+        if noun_drv_as_noun and _is_noun_drv(analysis):
+            _noun_drv_as_noun(analysis)
 
-                if set(analysis["PARTS"]).intersection({"-meH:v", "-DI':v", "-chugh:v", "-vIS:v", "-pa':v", "-mo':v"}):
-                    bits |= {"Subordinate"}
-            
-            elif info["ROLE"] == "NP":
-                if "inhps" in analysis["BOQWIZ_POS"] or "inhpl" in analysis["BOQWIZ_POS"]:
-                    info["PLURAL"] = False
-                    bits |= {"Singular"}
-
-                if analysis.get("SUFFIX", {}).get("N2", None) in {"-pu'", "-Du'", "-mey"}:
-                    info["PLURAL"] = True
-                    bits |= {"Plural"}
-                
-                n4 = analysis.get("SUFFIX", {}).get("N4", None)
-                if n4 and n4 not in {"-vam", "-vetlh"}:
-                    bits |= {"PossessiveSuffix"}
-            
-            
-            for part in analysis["PARTS"]:
-                if ":" not in part:
-                    bits |= {part}
-                
-                else:
-                    bits |= {part, part[:part.index(":")]}
-                
-                if part in LOCATIVE_NOUNS:
-                    bits |= {"LocativeNoun"}
-            
-            for key, val in analysis.get("SUFFIX", {}).items():
-                bits |= {key, val}
-            
-            if prefix := analysis.get("PREFIX", None):
-                bits |= {prefix}
-            
-            info["BITS"] = bits
+    return ans
 
-        if noun_drv_as_noun:
-            if analysis["POS"] == "V" and analysis.get("SUFFIX", {}).get("V9", None) in {"-wI'", "-ghach"}:
-                analysis["POS"] = "N"
-                analysis["XPOS"] = "N"
-                lemma = ""
-                for part in analysis["PARTS"]:
-                    lemma += _get_part_form(part)
-                    if part in {"-wI':v", "-ghach:v"}:
-                        break
+def _is_noun_drv(analysis: Analysis) -> bool:
+    """
+    Returns true if the analysis is a verb nominalized with -wI' or -ghach.
+    """
+    return analysis["POS"] == "V" and analysis.get("SUFFIX", {}).get("V9", None) in {"-wI'", "-ghach"}
 
-                analysis["LEMMA"] = lemma
+def _noun_drv_as_noun(analysis: Analysis) -> Analysis:
+    """
+    Changes a nominalized verb to a noun whose lemma includes the suffixes up to the nominalizer.
+    """
+    analysis["POS"] = "N"
+    analysis["XPOS"] = "N"
+    lemma = ""
+    for part in analysis["PARTS"]:
+        lemma += _get_part_form(part)
+        if part in {"-wI':v", "-ghach:v"}:
+            break
 
-    return ans
+    analysis["LEMMA"] = lemma
+    return analysis
+
+def _analyze_frozen(word: str, include_syntactical_info: bool, noun_drv_as_noun: bool) -> Tuple[CompactAnalysis, ...]:
+    return tuple(CompactAnalysis.from_dict(analysis) for analysis in _analyze(word, include_syntactical_info, noun_drv_as_noun))
+
+ANALYSIS_CACHE_SIZE = 65536
+
+_analyze_cached = functools.lru_cache(maxsize=ANALYSIS_CACHE_SIZE)(_analyze_frozen)
+
+def set_analysis_cache_size(maxsize: Optional[int]):
+    """
+    Sets the maximum number of cached `analyze` results and clears the cache. Zero disables caching and None makes the cache unbounded.
+    """
+    global _analyze_cached
+    _analyze_cached = functools.lru_cache(maxsize=maxsize)(_analyze_frozen)
+
+def analysis_cache_info():
+    """
+    Returns the hits, misses, maximum size and current size of the `analyze` cache as a named tuple.
+    """
+    return _analyze_cached.cache_info()
+
+def clear_analysis_cache():
+    """
+    Removes all cached `analyze` results and resets the statistics.
+    """
+    _analyze_cached.cache_clear()
 
 def _get_part_form(part: str) -> str:
     if "-:" in part:
@@ -601,19 +691,31 @@ def tokenize(sentence: str) -> List[Tuple[TokenType, str]]:
     return tokens
 
 def _tokenize_for_proofreader(sentence: str) -> List[Token]:
+    profile = profiling.PROFILE
+    if profile:
+        start = time.perf_counter()
+    
     tokens: List[Token] = []
     char = 0
     for token in tokenize(sentence):
         if token[0] != "SPACE":
-            tokens.append(Token(char, token[0], token[1], analyze(token[1], include_syntactical_info=True)))
+            tokens.append(Token(char, token[0], token[1], analyze(token[1], frozen=True)))
         
         char += len(token[1])
     
+    if profile:
+        profile.analyzer_seconds += time.perf_counter() - start
+    
     return tokens
 
-def get_errors(sentence: str) -> List[ProofreaderError]:
+def get_errors(sentence: str, overlapping=False, rules: List[GrammarRule] = GRAMMAR_RULES) -> List[ProofreaderError]:
+    """
+    Returns the errors in the given text. All non-overlapping matches of each grammar rule are reported, or all matches if `overlapping` is true.
+
+    `rules` can be used to check the text with other rules, such as a pack loaded with `load_rule_pack`.
+    """
     tokens = _tokenize_for_proofreader(sentence)
-    return proofread_tokens(tokens)
+    return proofread_tokens(tokens, rules, overlapping=overlapping)
 
 def get_errors_old(sentence: str) -> List[ProofreaderError]:
     errors: List[ProofreaderError] = []
@@ -680,25 +782,6 @@ def text_to_conllu_without_tagger(text: str) -> str:
     Converts a given text to the CONLL-U format with morphological information (dependencies are not parsed).
     If a word has multiple analyses, its POS and other info is not included (as they are not exactly known).
     """
-    ans = []
-    tokens = tokenize(text)
-    i = 1
-    for token_type, token in tokens:
-        if token_type == "SPACE":
-            continue
+    from .doc import Doc
 
-        elif token_type == "PUNCT":
-            ans.append("{}\t{}\t{}\tPUNCT\tPUNCT\t_\t_\t_\t_\t_".format(i, token, token))
-            if token in ".!?":
-                i = 1
-                ans.append("")
-            
-            else:
-                i += 1
-        
-        else:
-            analyses = analyze(token, noun_drv_as_noun=True)
-            ans.append("\t".join(_word_to_conllu(i, token, analyses)))
-            i += 1
-    
-    return "\n".join(ans)
+    return Doc(text).to_conllu()
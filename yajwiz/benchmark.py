@@ -0,0 +1,400 @@
+import argparse
+import time
+
+from typing import Callable, List
+
+def _best_time(function: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+def _print_table(rows: List[tuple]):
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)))
+
+def bench_startup(args: argparse.Namespace):
+    """
+    Compares loading the dictionary from the JSON file to loading it from the precompiled snapshot.
+    """
+    from . import boqwiz
+
+    data = boqwiz._try_load()
+    if not data:
+        print("The dictionary is not installed.")
+        return
+
+    boqwiz._write_snapshot(boqwiz.BoqwizDictionary.from_json(data))
+
+    json_time = _best_time(lambda: boqwiz.BoqwizDictionary.from_json(boqwiz._try_load()), args.repeat)
+    snapshot_time = _best_time(boqwiz._try_load_snapshot, args.repeat)
+
+    _print_table([
+        ("path", "seconds"),
+        ("json", f"{json_time:.4f}"),
+        ("snapshot", f"{snapshot_time:.4f}"),
+    ])
+    print(f"Speedup: {json_time / snapshot_time:.1f}x")
+
+def bench_morphology(args: argparse.Namespace):
+    """
+    Compares the lemma regexes to the trie-based matchers on inflected forms of all dictionary words.
+    """
+    from . import analyzer, morphology
+
+    analyzer.warmup()
+    analyzer._create_regexes()
+    words = morphology._test_words(sorted(analyzer.ALL_WORDS))
+
+    rows = [("pattern", "regex", "matcher")]
+    for name, regex, matcher in [
+        ("noun", analyzer.NOUN_REGEX, analyzer.NOUN_MATCHER),
+        ("verb", analyzer.VERB_REGEX, analyzer.VERB_MATCHER),
+        ("stative verb", analyzer.STATIVE_VERB_REGEX, analyzer.STATIVE_VERB_MATCHER),
+    ]:
+        regex_time = _best_time(lambda: [regex.fullmatch(word) for word in words], args.repeat)
+        matcher_time = _best_time(lambda: [matcher.fullmatch(word) for word in words], args.repeat)
+        rows.append((name, f"{regex_time:.4f}", f"{matcher_time:.4f}"))
+
+    print(f"{len(words)} words")
+    _print_table(rows)
+
+def _ambiguous_words(limit: int) -> List[str]:
+    from . import analyzer, morphology
+
+    analyzer.warmup()
+    words = ["yInwI'", "HeghwI'", "lo'laHbe'", "tu'lu'"]
+    for word in morphology._test_words(sorted(analyzer.ALL_WORDS)):
+        if len(words) >= limit:
+            break
+
+        analyses = analyzer._analyze(word, False, False)
+        if len(analyses) > 1 or any(len(analysis["PARTS"]) > 4 for analysis in analyses):
+            words.append(word)
+
+    return words
+
+def bench_expansion(args: argparse.Namespace):
+    """
+    Measures the time and the peak memory of expanding matches to analyses for ambiguous and heavily suffixed words.
+    """
+    import tracemalloc
+    from . import analyzer
+
+    words = _ambiguous_words(args.words)
+    expansion_time = _best_time(lambda: [analyzer._analyze(word, False, False) for word in words], args.repeat)
+
+    tracemalloc.start()
+    peaks = []
+    for word in words:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        analyzer._analyze(word, False, False)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+
+    tracemalloc.stop()
+
+    _print_table([
+        ("words", "seconds", "µs/word", "mean peak bytes/word", "max peak bytes/word"),
+        (len(words), f"{expansion_time:.4f}", f"{expansion_time / len(words) * 1e6:.1f}", sum(peaks) // len(peaks), max(peaks)),
+    ])
+
+def bench_memory(args: argparse.Namespace):
+    """
+    Compares the memory retained by dict analyses to that of compact analyses.
+    """
+    import tracemalloc
+    from . import analyzer
+    from .types import CompactAnalysis
+
+    words = _ambiguous_words(args.words)
+    rows = [("syntax info", "analyses", "dict bytes", "compact bytes", "saved")]
+    for include_syntactical_info in [False, True]:
+        analyses = [analysis for word in words for analysis in analyzer._analyze(word, include_syntactical_info, False)]
+
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        dicts = [analysis for word in words for analysis in analyzer._analyze(word, include_syntactical_info, False)]
+        dict_bytes = tracemalloc.get_traced_memory()[0] - base
+        del dicts
+
+        base = tracemalloc.get_traced_memory()[0]
+        compacts = [CompactAnalysis.from_dict(analysis) for analysis in analyses]
+        compact_bytes = tracemalloc.get_traced_memory()[0] - base
+        del compacts
+        tracemalloc.stop()
+
+        rows.append((include_syntactical_info, len(analyses), dict_bytes, compact_bytes, f"{1 - compact_bytes / dict_bytes:.0%}"))
+
+    _print_table(rows)
+
+def _document(words: List[str], sentence_length: int = 8) -> str:
+    sentences = [" ".join(words[i:i+sentence_length]) for i in range(0, len(words), sentence_length)]
+    return ". ".join(sentences) + "."
+
+def bench_bits(args: argparse.Namespace):
+    """
+    Compares proofreading with all syntax bits computed up front to computing only the bits that the rules need.
+    """
+    from . import analyzer, grammar_rules, morphology
+    from .types import Token
+
+    analyzer.warmup()
+    words = morphology._test_words(sorted(analyzer.ALL_WORDS))[:args.words]
+    document = _document(words)
+
+    def full_bits(rules):
+        tokens = []
+        char = 0
+        for token_type, text in analyzer.tokenize(document):
+            if token_type != "SPACE":
+                tokens.append(Token(char, token_type, text, analyzer.analyze(text, include_syntactical_info=True, frozen=True)))
+
+            char += len(text)
+
+        return grammar_rules.proofread_tokens(tokens, rules)
+
+    def lazy_bits(rules):
+        return grammar_rules.proofread_tokens(analyzer._tokenize_for_proofreader(document), rules)
+
+    def cold(function, rules):
+        def run():
+            analyzer.clear_analysis_cache()
+            function(rules)
+
+        return _best_time(run, args.repeat)
+
+    rows = [("rules", "full bits", "lazy bits")]
+    for rules in [grammar_rules.GRAMMAR_RULES[:1], grammar_rules.GRAMMAR_RULES]:
+        rows.append((len(rules), f"{cold(full_bits, rules):.4f}", f"{cold(lazy_bits, rules):.4f}"))
+
+    print(f"{len(words)} words")
+    _print_table(rows)
+
+def _synthetic_rules(words: List[str], count: int, seed: int = 0) -> list:
+    import random
+    from .grammar_rules import GrammarRule
+
+    rng = random.Random(seed)
+    templates = [
+        "{{«{0}»}} error{{«{1}»}}",
+        "{{«{0}»}} {{N}}* error{{VP,!«{1}»}}",
+        "({{«{0}»}}|{{«{1}»}}) {{V7}}",
+        "{{Punct}} error{{«{0}»,!Subj3}}",
+    ]
+    rules = []
+    for i in range(count):
+        pattern = rng.choice(templates).format(rng.choice(words), rng.choice(words))
+        rules.append(GrammarRule.from_dict(name=f"synthetic {i}", pattern=pattern, message="SYNTHETIC"))
+
+    return rules
+
+def bench_rules(args: argparse.Namespace):
+    """
+    Compares encoding the document separately for each rule to encoding it once for all rules, as the number of rules grows.
+    """
+    from . import analyzer, grammar_rules, morphology
+
+    analyzer.warmup()
+    words = morphology._test_words(sorted(analyzer.ALL_WORDS))[:args.words]
+    tokens = analyzer._tokenize_for_proofreader(_document(words))
+
+    def per_rule(rules):
+        for rule in rules:
+            conditions = rule.token_pattern.conditions
+            encoding = [sum(1 << i for i, condition in enumerate(conditions) if grammar_rules._condition_matches(token_masks, condition)) for token_masks in grammar_rules._token_masks(tokens)]
+            list(rule.token_pattern.finditer(encoding, [1 << i for i in range(len(conditions))]))
+
+    rows = [("rules", "per rule", "shared")]
+    all_rules = grammar_rules.GRAMMAR_RULES + _synthetic_rules(sorted(set(words)), 1000)
+    for count in [10, 100, 1000]:
+        rules = all_rules[:count]
+        grammar_rules.proofread_tokens(tokens, rules)
+        rows.append((count, f"{_best_time(lambda: per_rule(rules), args.repeat):.4f}", f"{_best_time(lambda: grammar_rules.proofread_tokens(tokens, rules), args.repeat):.4f}"))
+
+    print(f"{len(words)} words")
+    _print_table(rows)
+
+def bench_matches(args: argparse.Namespace):
+    """
+    Compares checking a document with hundreds of errors sentence by sentence to checking it in one call.
+    """
+    import re
+    from . import analyzer, grammar_rules
+
+    analyzer.warmup()
+    examples = [example.replace("\n", " ").rstrip(".") + "." for rule in grammar_rules.GRAMMAR_RULES for example in rule.positive_examples]
+    sentences = (examples * (args.words // len(examples) + 1))[:args.words // 4]
+    document = " ".join(sentences)
+
+    per_sentence_errors = sum(len(analyzer.get_errors(sentence)) for sentence in re.split(r"(?<=[.!?]) ", document))
+    document_errors = len(analyzer.get_errors(document))
+    per_sentence_time = _best_time(lambda: [analyzer.get_errors(sentence) for sentence in re.split(r"(?<=[.!?]) ", document)], args.repeat)
+    document_time = _best_time(lambda: analyzer.get_errors(document), args.repeat)
+
+    print(f"{len(sentences)} sentences")
+    _print_table([
+        ("calls", "errors", "seconds"),
+        ("per sentence", per_sentence_errors, f"{per_sentence_time:.4f}"),
+        ("whole document", document_errors, f"{document_time:.4f}"),
+    ])
+
+def bench_session(args: argparse.Namespace):
+    """
+    Compares checking the whole document again after an edit to re-checking only the edited sentence with a document session.
+    """
+    from . import analyzer, grammar_rules
+    from .session import DocumentSession
+
+    analyzer.warmup()
+    examples = [example.replace("\n", " ").rstrip(".") + "." for rule in grammar_rules.GRAMMAR_RULES for example in rule.positive_examples]
+    sentences = (examples * (args.words // len(examples) + 1))[:args.words // 4]
+    document = " ".join(sentences)
+    edited = document.replace(sentences[len(sentences) // 2], "qoH vIlegh.", 1)
+
+    def incremental():
+        session = DocumentSession(document)
+        start = time.perf_counter()
+        session.update(edited)
+        return time.perf_counter() - start, session.checked_sentences
+
+    full_time = _best_time(lambda: analyzer.get_errors(edited), args.repeat)
+    incremental_time, checked = min(incremental() for _ in range(args.repeat))
+
+    print(f"{len(sentences)} sentences")
+    _print_table([
+        ("check", "sentences checked", "seconds"),
+        ("full", len(sentences), f"{full_time:.4f}"),
+        ("incremental", checked, f"{incremental_time:.4f}"),
+    ])
+
+def bench_tagger(args: argparse.Namespace):
+    """
+    Compares the accuracy and the speed of the Viterbi and greedy tagger decoders on held-out sentences of a CoNLL-U corpus.
+    """
+    import random
+    from . import analyzer, grammar_rules, morphology
+    from .pos_tagger import Tagger, conllu_to_tagged_list
+
+    if args.conllu:
+        with open(args.conllu, "r") as f:
+            corpus = f.read()
+    
+    else:
+        print("No corpus was given with --conllu, using the output of the untrained tagger on generated text.")
+        analyzer.warmup()
+        examples = [example.replace("\n", " ") for rule in grammar_rules.GRAMMAR_RULES for example in rule.positive_examples + rule.negative_examples]
+        corpus = analyzer.text_to_conllu_without_tagger(" ".join(examples) + " " + _document(morphology._test_words(sorted(analyzer.ALL_WORDS))[:args.words]))
+
+    rng = random.Random(0)
+    sentences = conllu_to_tagged_list(corpus)
+    rng.shuffle(sentences)
+    held_out = len(sentences) // 10 or 1
+    tagger = Tagger()
+    tagger.train(sentences[held_out:])
+
+    # A third of the known word tags of the held-out sentences are hidden and the decoders must restore them
+    tests = []
+    for sentence in sentences[:held_out]:
+        hidden = [i for i, (_word, tag) in enumerate(sentence) if tag and tag != "PUNCT" and rng.random() < 1/3]
+        tests.append((sentence, hidden, [(word, None) if i in hidden else (word, tag) for i, (word, tag) in enumerate(sentence)]))
+    
+    hidden_count = sum(len(hidden) for _sentence, hidden, _masked in tests) or 1
+    token_count = sum(len(sentence) for sentence, _hidden, _masked in tests)
+    rows = [("decoder", "accuracy", "seconds", "tokens/s")]
+    for decoder in ["greedy", "viterbi"]:
+        correct = sum(tagged[i][1] == sentence[i][1] for sentence, hidden, masked in tests for tagged in [tagger.tag(masked, decoder)] for i in hidden)
+        seconds = _best_time(lambda: [tagger.tag(masked, decoder) for _sentence, _hidden, masked in tests], args.repeat)
+        rows.append((decoder, f"{correct / hidden_count:.1%}", f"{seconds:.4f}", f"{token_count / seconds:.0f}"))
+    
+    print(f"{len(sentences) - held_out} training sentences, {held_out} held-out sentences, {hidden_count} hidden tags")
+    _print_table(rows)
+
+def bench_doc(args: argparse.Namespace):
+    """
+    Compares proofreading and converting a text to CONLL-U with separate calls to doing both with one analyzed document.
+    """
+    from . import analyzer, grammar_rules, morphology
+    from .doc import Doc
+    from .pos_tagger import Tagger, text_to_conllu
+
+    analyzer.warmup()
+    examples = [example.replace("\n", " ") for rule in grammar_rules.GRAMMAR_RULES for example in rule.positive_examples + rule.negative_examples]
+    text = " ".join(examples) + " " + _document(morphology._test_words(sorted(analyzer.ALL_WORDS))[:args.words])
+    tagger = Tagger()
+    tagger.train(Doc(text).tag(Tagger()))
+
+    def separate():
+        analyzer.get_errors(text)
+        text_to_conllu(text)
+        text_to_conllu(text, tagger)
+
+    def shared():
+        doc = Doc(text)
+        doc.errors()
+        doc.to_conllu()
+        doc.to_conllu(tagger)
+
+    rows = [("analysis cache", "separate calls", "shared document")]
+    for cache_size in [analyzer.ANALYSIS_CACHE_SIZE, 0]:
+        analyzer.set_analysis_cache_size(cache_size)
+        rows.append((cache_size or "disabled", f"{_best_time(separate, args.repeat):.4f}", f"{_best_time(shared, args.repeat):.4f}"))
+    
+    analyzer.set_analysis_cache_size(analyzer.ANALYSIS_CACHE_SIZE)
+    _print_table(rows)
+
+def bench_conllu(args: argparse.Namespace):
+    """
+    Compares converting a text to CONLL-U in one process to converting it in parallel with different numbers of processes.
+    """
+    import os
+    from . import analyzer, grammar_rules, morphology
+    from .pos_tagger import Tagger, conllu_to_tagged_list, text_to_conllu
+
+    analyzer.warmup()
+    examples = [example.replace("\n", " ") for rule in grammar_rules.GRAMMAR_RULES for example in rule.positive_examples + rule.negative_examples]
+    text = " ".join(examples) + " " + _document(morphology._test_words(sorted(analyzer.ALL_WORDS))[:args.words])
+    tagger = Tagger()
+    tagger.train(conllu_to_tagged_list(text_to_conllu(text)))
+    serial = text_to_conllu(text, tagger)
+
+    rows = [("processes", "seconds", "identical")]
+    for processes in sorted({1, 2, 4, os.cpu_count() or 1}):
+        analyzer.clear_analysis_cache()
+        rows.append((processes, f"{_best_time(lambda: text_to_conllu(text, tagger, processes=processes), args.repeat):.4f}", text_to_conllu(text, tagger, processes=processes) == serial))
+    
+    print(f"{os.cpu_count()} processors")
+    _print_table(rows)
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "morphology": bench_morphology,
+    "expansion": bench_expansion,
+    "memory": bench_memory,
+    "bits": bench_bits,
+    "rules": bench_rules,
+    "matches": bench_matches,
+    "session": bench_session,
+    "tagger": bench_tagger,
+    "doc": bench_doc,
+    "conllu": bench_conllu,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="yajwI' benchmarks")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="How many times each measurement is repeated")
+    parser.add_argument("-n", "--words", type=int, default=5000, help="How many words are used by the analyzer benchmarks")
+    parser.add_argument("--conllu", help="The CoNLL-U corpus used by the tagger benchmark")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    for name, function in BENCHMARKS.items():
+        subparsers.add_parser(name, help=function.__doc__.strip())
+
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from typing import Dict, Iterable, List, Set
+
+# Only bits referenced by grammar rules are registered, so the masks stay small even though
+# SYNTAX_INFO contains a «word» bit for every word
+BIT_POSITIONS: Dict[str, int] = {}
+BIT_NAMES: List[str] = []
+
+def register_bit(name: str) -> int:
+    """
+    Returns the mask of the given bit, assigning it the next free position if it is not registered yet.
+    """
+    if name not in BIT_POSITIONS:
+        BIT_POSITIONS[name] = len(BIT_NAMES)
+        BIT_NAMES.append(name)
+
+    return 1 << BIT_POSITIONS[name]
+
+def generation() -> int:
+    """
+    Returns a number that changes whenever a new bit is registered. Masks computed in an older generation may be missing bits.
+    """
+    return len(BIT_NAMES)
+
+def bits_to_mask(names: Iterable[str]) -> int:
+    """
+    Converts a set of bit names to a mask. Names that are not registered are ignored.
+    """
+    mask = 0
+    for name in names:
+        position = BIT_POSITIONS.get(name)
+        if position is not None:
+            mask |= 1 << position
+
+    return mask
+
+def mask_to_bits(mask: int) -> Set[str]:
+    return {name for i, name in enumerate(BIT_NAMES) if mask >> i & 1}
@@ -1,17 +1,22 @@
-from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+from typing import Any, BinaryIO, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
 import appdirs
 import bz2
 import json
+import os
 from pathlib import Path
-import requests
+import pickle
 import logging
 import sys
 import unicodedata
 
+from . import __version__
+
 logger = logging.Logger("yajwiz")
 
 DATA_DIR = Path(appdirs.user_data_dir("yajwiz"))
 DICTIONARY_PATH = DATA_DIR / "dictionary.json"
+SNAPSHOT_PATH = DATA_DIR / "dictionary.pickle"
+SNAPSHOT_FORMAT = 1
 
 KAWHAQ_URL = "https://de7vid.github.io/qawHaq/"
 FORMAT = "iOS-1"
@@ -126,20 +131,112 @@ def _try_load() -> Optional[dict]:
         logger.error("Error while reading the dictionary!", exc_info=sys.exc_info())
         return None
 
+def _source_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+        return stat.st_size, stat.st_mtime_ns
+    
+    except OSError:
+        return None
+
+def _load_snapshot(path: Path, key: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Any]]:
+    """
+    Loads a snapshot written by `_save_snapshot`. Returns None if the snapshot does not exist or if its header does not match the given key.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict) or any(header.get(k) != v for k, v in key.items()):
+                return None
+            
+            return header, pickle.load(f)
+    
+    except FileNotFoundError:
+        return None
+    
+    except:
+        logger.warning(f"Error while reading the snapshot {path}!", exc_info=sys.exc_info())
+        return None
+
+def _write_atomically(path: Path, write: Callable[[BinaryIO], None]):
+    """
+    Writes a file with `write` to a temporary file that then replaces `path`, so that other processes never see a partially written file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        
+        os.replace(tmp_path, path)
+    
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+def _save_snapshot(path: Path, header: Dict[str, Any], data: Any):
+    """
+    Atomically writes a snapshot that consists of a header dict followed by the pickled data.
+    """
+    def write(f: BinaryIO):
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    try:
+        _write_atomically(path, write)
+    
+    except:
+        logger.warning(f"Error while writing the snapshot {path}!", exc_info=sys.exc_info())
+
+def _snapshot_key() -> Dict[str, Any]:
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "yajwiz": __version__,
+        "source": _source_stamp(DICTIONARY_PATH),
+    }
+
+def _try_load_snapshot() -> Optional[BoqwizDictionary]:
+    if not DICTIONARY_PATH.exists():
+        return None
+    
+    snapshot = _load_snapshot(SNAPSHOT_PATH, _snapshot_key())
+    if snapshot and isinstance(snapshot[1], BoqwizDictionary):
+        return snapshot[1]
+    
+    return None
+
+def _write_snapshot(dictionary: BoqwizDictionary):
+    _save_snapshot(SNAPSHOT_PATH, {**_snapshot_key(), "version": dictionary.version}, dictionary)
+
+def _installed_version() -> Optional[str]:
+    snapshot = _load_snapshot(SNAPSHOT_PATH, _snapshot_key()) if DICTIONARY_PATH.exists() else None
+    if snapshot:
+        return snapshot[0].get("version")
+    
+    data = _try_load()
+    return data["version"] if data else None
+
 cached_dictionary: Optional[BoqwizDictionary] = None
 
 def load_dictionary() -> BoqwizDictionary:
     """
     Loads the currently installed version of the boQwI' dictionary.
+
+    A precompiled snapshot of the dictionary is used when it is up to date, otherwise the JSON file is parsed and the snapshot is rewritten.
     """
 
     global cached_dictionary
     if cached_dictionary:
         return cached_dictionary
 
+    if snapshot := _try_load_snapshot():
+        cached_dictionary = snapshot
+        return cached_dictionary
+
     data = _try_load()
     if data:
         cached_dictionary = BoqwizDictionary.from_json(data)
+        _write_snapshot(cached_dictionary)
         return cached_dictionary
     
     else:
@@ -153,6 +250,8 @@ def update_dictionary():
 
     global cached_dictionary
 
+    import requests
+
     # download the manifest and the latest version
     logger.info("Updating boQwI'...")
     try:
@@ -168,8 +267,7 @@ def update_dictionary():
         logger.info(f"No update required.")
         return
 
-    data = _try_load()
-    if data and data["version"] == latest:
+    if _installed_version() == latest:
         logger.info(f"No update required.")
         return
     
@@ -183,6 +281,10 @@ def update_dictionary():
         with open(DICTIONARY_PATH, "w") as f:
             f.write(data)
 
+        dictionary = BoqwizDictionary.from_json(_normalize(json.loads(data)))
+        _write_snapshot(dictionary)
+        cached_dictionary = dictionary
+
         logger.info(f"Updated boQwI' to version {latest}.")
     
     except:
@@ -0,0 +1,157 @@
+from typing import Iterable, Iterator, List, Optional, TextIO, Union
+
+FIELD_NAMES = ["id", "form", "lemma", "upos", "xpos", "feats", "head", "deprel", "deps", "misc"]
+
+class ConlluWord:
+    """
+    A word line of a CONLL-U file. The fields are split from the line only when they are first accessed.
+    """
+
+    __slots__ = ("line", "_fields")
+
+    def __init__(self, line: str):
+        self.line = line
+        self._fields: Optional[List[str]] = None
+
+    @property
+    def fields(self) -> List[str]:
+        if self._fields is None:
+            self._fields = self.line.split("\t")
+
+        return self._fields
+
+    id = property(lambda self: self.fields[0])
+    form = property(lambda self: self.fields[1])
+    lemma = property(lambda self: self.fields[2])
+    upos = property(lambda self: self.fields[3])
+    xpos = property(lambda self: self.fields[4])
+    feats = property(lambda self: self.fields[5])
+    head = property(lambda self: self.fields[6])
+    deprel = property(lambda self: self.fields[7])
+    deps = property(lambda self: self.fields[8])
+    misc = property(lambda self: self.fields[9])
+
+    def __repr__(self) -> str:
+        return f"ConlluWord({self.line!r})"
+
+def _is_word_line(line: str) -> bool:
+    """
+    Returns true if the line is a word line, and not a comment, a multiword token range (eg. 1-2) or an empty node (eg. 1.1).
+    """
+    if line.startswith("#"):
+        return False
+
+    word_id = line.split("\t", 1)[0]
+    return "-" not in word_id and "." not in word_id
+
+class ConlluSentence:
+    """
+    A sentence of a CONLL-U file. `lines` contains all lines of the sentence without line breaks, including comments,
+    multiword token ranges and empty nodes, so that the sentence can be written back unchanged.
+    """
+
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+
+    @property
+    def comments(self) -> List[str]:
+        return [line for line in self.lines if line.startswith("#")]
+
+    @property
+    def words(self) -> List[ConlluWord]:
+        """
+        The syntactic words of the sentence. Multiword token ranges and empty nodes are not included.
+        """
+        return [ConlluWord(line) for line in self.lines if _is_word_line(line)]
+
+    def __str__(self) -> str:
+        return "\n".join(self.lines)
+
+    def __repr__(self) -> str:
+        return f"ConlluSentence({self.lines!r})"
+
+def read_conllu(lines: Union[TextIO, Iterable[str]]) -> Iterator[ConlluSentence]:
+    """
+    Reads sentences from a CONLL-U file or any other iterable of lines, one sentence at a time.
+
+    A sentence ends at an empty line, or when a comment, a word with id 1 or a multiword token range starting from 1 follows
+    the words of the sentence, so that sentences without empty lines between them are also read correctly.
+    """
+    sentence: List[str] = []
+    has_words = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if sentence:
+                yield ConlluSentence(sentence)
+                sentence = []
+                has_words = False
+
+            continue
+
+        if has_words and line.startswith(("#", "1\t", "1-")):
+            yield ConlluSentence(sentence)
+            sentence = []
+            has_words = False
+
+        sentence.append(line)
+        has_words = has_words or _is_word_line(line)
+
+    if sentence:
+        yield ConlluSentence(sentence)
+
+def write_conllu(sentences: Iterable[Union[ConlluSentence, List[str]]], file: TextIO):
+    """
+    Writes the sentences to a file, each followed by an empty line. The sentences can also be given as lists of lines.
+    """
+    for sentence in sentences:
+        lines = sentence.lines if isinstance(sentence, ConlluSentence) else sentence
+        file.write("\n".join(lines) + "\n\n")
+
+def test_conllu():
+    """
+    Checks that sentences are read the same with and without empty lines between them, and that they are written back unchanged.
+    """
+    import io
+
+    sentences = [
+        ["# sent_id = 1", "# text = qaleghneS", "1\tqaleghneS\tlegh\tVERB\tVT\t_\t_\t_\t_\t_"],
+        ["# sent_id = 2", "1-2\tjIyajbe'\t_\t_\t_\t_\t_\t_\t_\t_", "1\tjIyaj\tyaj\tVERB\tVT\t_\t_\t_\t_\t_",
+         "2\tbe'\tbe'\tPART\tADV\t_\t_\t_\t_\t_", "2.1\t_\t_\t_\t_\t_\t_\t_\t_\t_"],
+        ["1-2\tSoHvaD\t_\t_\t_\t_\t_\t_\t_\t_", "1\tSoH\tSoH\tPRON\tPRON\t_\t_\t_\t_\t_", "2\t-vaD\t-vaD\tADP\tN5\t_\t_\t_\t_\t_"],
+        ["1\tjIH\tjIH\tPRON\tPRON\t_\t_\t_\t_\t_", "2\tneH\tneH\tVERB\tVT\t_\t_\t_\t_\t_"],
+        ["# text = Qapla'", "1\tQapla'\tQapla'\tNOUN\tN\t_\t_\t_\t_\t_"],
+    ]
+    succ = 0
+    fail = 0
+    for name, text in [
+        ("with empty lines", "".join("\n".join(sentence) + "\n\n" for sentence in sentences)),
+        ("without empty lines", "".join(line + "\n" for sentence in sentences for line in sentence)),
+    ]:
+        read = [sentence.lines for sentence in read_conllu(io.StringIO(text))]
+        if read == sentences:
+            succ += 1
+
+        else:
+            print("Reading", name)
+            print("->", read)
+            print()
+            fail += 1
+
+    output = io.StringIO()
+    write_conllu(read_conllu(io.StringIO(text)), output)
+    if output.getvalue() == "".join("\n".join(sentence) + "\n\n" for sentence in sentences):
+        succ += 1
+
+    else:
+        print("Writing")
+        print("->", output.getvalue())
+        print()
+        fail += 1
+
+    print(f"Result: {succ} ok, {fail} failed")
+
+if __name__ == "__main__":
+    test_conllu()
@@ -0,0 +1,164 @@
+import time
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import profiling
+from .analyzer import _is_noun_drv, _noun_drv_as_noun, _word_to_conllu, analyze, split_to_morphemes, tokenize
+from .conllu import ConlluSentence
+from .grammar_rules import GRAMMAR_RULES, GrammarRule, proofread_tokens
+from .types import CompactAnalysis, ProofreaderError, Token
+
+if TYPE_CHECKING:
+    from .pos_tagger import Tagger
+
+PUNCT_LINE = "{}\t{}\t{}\tPUNCT\tPUNCT\t_\t_\t_\t_\t_"
+
+class Doc:
+    """
+    A text that is tokenized and analyzed once, so that it can be proofread, tagged and converted to CONLL-U without
+    analyzing it again.
+
+    `tokens` contains the tokens other than spaces with their locations and analyses, and `sentences` contains the start and end
+    indices of the tokens of each sentence. A sentence ends after a period, an exclamation mark or a question mark.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens: List[Token] = []
+        self.sentences: List[Tuple[int, int]] = []
+        self._analyses: Dict[str, List[CompactAnalysis]] = {}
+        self._noun_drv_analyses: Dict[str, List[CompactAnalysis]] = {}
+
+        profile = profiling.PROFILE
+        if profile:
+            start_time = time.perf_counter()
+
+        char = 0
+        start = 0
+        for token_type, token in tokenize(text):
+            if token_type != "SPACE":
+                self.tokens.append(Token(char, token_type, token, self.analyses(token)))
+                if token_type == "PUNCT" and token in ".!?":
+                    self.sentences.append((start, len(self.tokens)))
+                    start = len(self.tokens)
+
+            char += len(token)
+
+        if start < len(self.tokens):
+            self.sentences.append((start, len(self.tokens)))
+
+        if profile:
+            profile.analyzer_seconds += time.perf_counter() - start_time
+
+    def analyses(self, word: str) -> List[CompactAnalysis]:
+        """
+        Returns the analyses of a word. Each distinct word is analyzed only once per document.
+        """
+        if word not in self._analyses:
+            self._analyses[word] = analyze(word, frozen=True)
+
+        return self._analyses[word]
+
+    def noun_drv_analyses(self, word: str) -> List[CompactAnalysis]:
+        """
+        Returns the analyses of a word with nominalized verbs as nouns, like `analyze(word, noun_drv_as_noun=True)`.
+        """
+        if word not in self._noun_drv_analyses:
+            self._noun_drv_analyses[word] = [
+                CompactAnalysis.from_dict(_noun_drv_as_noun(analysis.to_dict())) if _is_noun_drv(analysis) else analysis
+                for analysis in self.analyses(word)
+            ]
+
+        return self._noun_drv_analyses[word]
+
+    def sentence_tokens(self) -> Iterator[List[Token]]:
+        for start, end in self.sentences:
+            yield self.tokens[start:end]
+
+    def errors(self, rules: List[GrammarRule] = GRAMMAR_RULES, overlapping=False) -> List[ProofreaderError]:
+        """
+        Returns the grammar errors of the text, like `get_errors`.
+        """
+        return proofread_tokens(self.tokens, rules, overlapping=overlapping)
+
+    def morphemes(self) -> List[Set[tuple]]:
+        """
+        Returns the morphemes of each word token, like `split_to_morphemes`.
+        """
+        morphemes: Dict[str, Set[tuple]] = {}
+        for token in self.tokens:
+            if token.token_type == "WORD" and token.text not in morphemes:
+                morphemes[token.text] = split_to_morphemes(token.text)
+
+        return [morphemes[token.text] for token in self.tokens if token.token_type == "WORD"]
+
+    def _tag_sentence(self, tokens: List[Token], tagger: "Tagger") -> Tuple[List[str], List[Tuple[str, Optional[str]]]]:
+        """
+        Tags the ambiguous words of a sentence and returns its CONLL-U lines and its (lemma, tag) pairs.
+        """
+        conllu = []
+        tagged_sent: List[Tuple[str, Optional[str]]] = []
+        # The analyses of the untagged words, whose XPOS_GSUFF values are the candidate tags of the word
+        sent_analyses = []
+        for i, token in enumerate(tokens):
+            if token.token_type == "PUNCT":
+                conllu.append(PUNCT_LINE.format(i+1, token.text, token.text))
+                tagged_sent.append((token.text, "PUNCT"))
+                sent_analyses.append(None)
+
+            else:
+                fields = _word_to_conllu(i+1, token.text, token.analyses)
+                conllu.append("\t".join(fields))
+                if fields[2] == "_":
+                    tagged_sent.append((token.text, None))
+                    sent_analyses.append(token.analyses)
+
+                else:
+                    tagged_sent.append((fields[2], fields[4]))
+                    sent_analyses.append(None)
+
+        candidates = [list(dict.fromkeys(analysis["XPOS_GSUFF"] for analysis in analyses)) if analyses else None for analyses in sent_analyses]
+        guessed_tags = tagger.tag(tagged_sent, candidates=candidates)
+        for i, ((l1, p1), (_l2, p2)) in enumerate(zip(tagged_sent, guessed_tags)):
+            if not p1 and p2:
+                for analysis in sent_analyses[i] or []:
+                    if analysis["XPOS_GSUFF"] == p2:
+                        conllu[i] = "\t".join(_word_to_conllu(i+1, l1, [analysis]))
+                        break
+
+        return conllu, guessed_tags
+
+    def tag(self, tagger: "Tagger") -> List[List[Tuple[str, Optional[str]]]]:
+        """
+        Returns the (lemma, tag) pairs of each sentence with the ambiguous words tagged by the tagger.
+        """
+        return [self._tag_sentence(tokens, tagger)[1] for tokens in self.sentence_tokens()]
+
+    def conllu_sentences(self, tagger: Optional["Tagger"] = None) -> Iterator[ConlluSentence]:
+        """
+        Yields the sentences in the CONLL-U format. If a tagger is given, it selects the analyses of the ambiguous words.
+        """
+        for tokens in self.sentence_tokens():
+            if tagger:
+                yield ConlluSentence(self._tag_sentence(tokens, tagger)[0])
+
+            else:
+                yield ConlluSentence([
+                    PUNCT_LINE.format(i+1, token.text, token.text) if token.token_type == "PUNCT" else "\t".join(_word_to_conllu(i+1, token.text, self.noun_drv_analyses(token.text)))
+                    for i, token in enumerate(tokens)
+                ])
+
+    def to_conllu(self, tagger: Optional["Tagger"] = None) -> str:
+        """
+        Returns the text in the CONLL-U format, like `text_to_conllu`.
+        """
+        if tagger:
+            return "".join("\n\n" + str(sentence) for sentence in self.conllu_sentences(tagger))
+
+        # Sentences that end with punctuation are followed by an empty line
+        lines = []
+        for (_start, end), sentence in zip(self.sentences, self.conllu_sentences()):
+            lines += sentence.lines
+            if self.tokens[end-1].token_type == "PUNCT" and self.tokens[end-1].text in ".!?":
+                lines.append("")
+
+        return "\n".join(lines)
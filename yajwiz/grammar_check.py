@@ -1,17 +1,115 @@
 import argparse
+import glob
+from itertools import islice
+import json
+import multiprocessing
+import os
 import re
 import sys
+from typing import Callable, Iterator, List, Optional, Tuple
 
 import yajwiz
+from yajwiz import profiling, server
+from yajwiz.types import ProofreaderError
+
+# How many lines are sent to a worker at a time
+CHUNK_LINES = 200
+
+Chunk = Tuple[str, int, List[str]]
+CheckedLine = Tuple[int, str, int, List[ProofreaderError]]
+
+_check: Optional[Callable[[str], List[ProofreaderError]]] = None
+
+def _load_rules(packs: Optional[List[str]]) -> list:
+    if not packs:
+        return yajwiz.grammar_rules.GRAMMAR_RULES
+    
+    rules = []
+    for pack in packs:
+        rules += yajwiz.grammar_rules.GRAMMAR_RULES if pack == "builtin" else yajwiz.load_rule_pack(pack)
+    
+    return rules
+
+def _init_worker(packs: Optional[List[str]], profile: bool = False):
+    """
+    Loads the analyzer and the rules once per process.
+    """
+    global _check
+    yajwiz.warmup()
+    if profile:
+        profiling.enable_profiling()
+    
+    rules = _load_rules(packs)
+    _check = lambda line: yajwiz.get_errors(line, rules=rules)
+
+def _check_chunk(chunk: Chunk) -> Tuple[str, List[CheckedLine], Optional[profiling.Profile]]:
+    """
+    Checks the lines of a chunk and returns the lines that have errors as (line number, stripped line, indentation, errors) tuples,
+    and the profile of the chunk if profiling is enabled.
+    """
+    path, first_line, lines = chunk
+    if profiling.PROFILE:
+        profiling.enable_profiling()
+    
+    checked = []
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        errors = sorted(_check(stripped), key=lambda error: error.location)
+        if errors:
+            checked.append((first_line + i, stripped, len(line) - len(line.lstrip()), errors))
+    
+    return path, checked, profiling.PROFILE
+
+def _expand_paths(patterns: List[str]) -> List[str]:
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else []
+        paths += matches or [pattern]
+    
+    return paths
+
+def _chunks(paths: List[str]) -> Iterator[Chunk]:
+    for path in paths:
+        try:
+            input_file = sys.stdin if path == "-" else open(path, "r")
+        
+        except OSError as e:
+            print(f"{path}: {e.strerror}", file=sys.stderr)
+            continue
+        
+        with input_file:
+            line_number = 1
+            while True:
+                lines = list(islice(input_file, CHUNK_LINES))
+                if not lines:
+                    break
+                
+                yield path, line_number, lines
+                line_number += len(lines)
 
 def main():
     parser = argparse.ArgumentParser(description="Klingon grammar checker")
-    parser.add_argument("input_file", default="-", help="The text file to be processed")
+    parser.add_argument("input_files", nargs="*", default=["-"], metavar="input_file", help="The text files to be processed. Glob patterns are expanded, and - reads the standard input")
     parser.add_argument("-I", "--ignore_unknown", action="store_true", help="Ignore unknown word errors")
     parser.add_argument("-w", "--additional_words", help="A comma-separated list of additional words to be added to the dictionary")
     parser.add_argument("-W", "--additional_words_file", help="A file that contains one additional word per line to be added to the dictionary")
+    parser.add_argument("-r", "--rules", action="append", metavar="PACK", help="A JSON or TOML rule pack to check the text with instead of the built-in rules. Can be given many times; \"builtin\" selects the built-in rules")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="How many processes check the files in parallel. 0 uses all processors")
+    parser.add_argument("-f", "--format", choices=["text", "jsonl"], default="text", help="The output format. jsonl prints one JSON object per error as soon as its chunk has been checked")
+    parser.add_argument("--profile", action="store_true", help="Print the time spent on each rule and how often the rules matched to stderr")
+    parser.add_argument("--serve", action="store_true", help="Run a server that keeps the analyzer warm and answers JSON-RPC requests on stdin/stdout, or on the socket given with --socket")
+    parser.add_argument("--socket", help="The Unix socket of the server. Without --serve, the text is checked by the server if one is running")
     args = parser.parse_args()
 
+    if args.serve:
+        if args.socket:
+            server.serve_socket(args.socket)
+        
+        else:
+            server.serve_stdio()
+        
+        return
+
     words = set()
     if args.additional_words:
         words |= {"UNKNOWN WORD "+word.strip() for word in args.additional_words.split(",")}
@@ -23,35 +121,75 @@ def main():
                 if line:
                     words.add("UNKNOWN WORD "+line)
 
-    if args.input_file and args.input_file != "-":
-        input_file = open(args.input_file, "r")
+    global _check
+    pool = None
+    client = server.connect(args.socket) if args.socket else None
+    if client:
+        packs = [pack if pack == "builtin" else os.path.abspath(pack) for pack in args.rules] if args.rules else None
+        _check = lambda line: client.check(line, rules=packs)
+        results = map(_check_chunk, _chunks(_expand_paths(args.input_files)))
+    
+    elif args.jobs == 1:
+        _init_worker(args.rules, args.profile)
+        results = map(_check_chunk, _chunks(_expand_paths(args.input_files)))
     
     else:
-        input_file = sys.stdin
+        pool = multiprocessing.Pool(args.jobs or None, initializer=_init_worker, initargs=(args.rules, args.profile))
+        results = pool.imap(_check_chunk, _chunks(_expand_paths(args.input_files)))
     
     count = 0
-    for i, line in enumerate(input_file):
-        line = line.strip()
-        errors = yajwiz.get_errors(line)
-        sentences = re.split(r"[.!?] ", line)
-        j = 0
-        for error in errors:
-            if error.message in words or args.ignore_unknown and error.message.startswith("UNKNOWN WORD"):
-                continue
-            
-            while j+len(sentences[0]) < error.location:
-                j += len(sentences[0]) + 2
-                sentences.pop(0)
-            
-            prefix = "Line " + str(i+1) + ": "
-            print(prefix + sentences[0])
-            print(prefix + " "*(error.location - j) + "^" + error.message)
-            print()
-            count += 1
-    
-    print(f"Found {count} errors")
-    
-    input_file.close()
+    profile = profiling.Profile()
+    for path, checked, chunk_profile in results:
+        if chunk_profile:
+            profile.merge(chunk_profile)
+        
+        for line_number, line, indentation, errors in checked:
+            sentences = re.split(r"[.!?] ", line)
+            j = 0
+            for error in errors:
+                if error.message in words or args.ignore_unknown and error.message.startswith("UNKNOWN WORD"):
+                    continue
+                
+                count += 1
+                if args.format == "jsonl":
+                    print(json.dumps({
+                        "file": path,
+                        "line": line_number,
+                        "column": indentation + error.location + 1,
+                        "end_column": indentation + error.end_location + 1,
+                        "rule": error.rule_name,
+                        "message": error.message,
+                        "replacement": error.replacement,
+                    }, ensure_ascii=False))
+                    continue
+                
+                while j+len(sentences[0]) < error.location:
+                    j += len(sentences[0]) + 2
+                    sentences.pop(0)
+                
+                prefix = ("" if len(args.input_files) == 1 and path == args.input_files[0] else path + ": ") + "Line " + str(line_number) + ": "
+                print(prefix + sentences[0])
+                print(prefix + " "*(error.location - j) + "^" + error.message)
+                print()
+        
+        sys.stdout.flush()
+    
+    if args.format == "text":
+        print(f"Found {count} errors")
+    
+    if args.profile:
+        if client:
+            print("The rules are not profiled when the text is checked by a server", file=sys.stderr)
+        
+        else:
+            print(profile.format(), file=sys.stderr)
+    
+    if pool:
+        pool.close()
+        pool.join()
+    
+    if client:
+        client.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,10 +1,16 @@
 from functools import reduce
-import regex as re
+import hashlib
+import json
+from pathlib import Path
+import re
+import time
 from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
-from yajwiz.types import Analysis, ProofreaderError, TokenType, Token
-
-def _bitset_to_bitstring(bitset: Dict[str, str], included_bits: List[str]) -> str:
-    return "".join(bitset.get(b, ".") for b in included_bits)
+from yajwiz import __version__, profiling
+from yajwiz.bits import bits_to_mask
+from yajwiz.boqwiz import DATA_DIR, _load_snapshot, _save_snapshot
+from yajwiz.syntax import syntax_mask
+from yajwiz.token_pattern import TokenPattern
+from yajwiz.types import Analysis, CompactAnalysis, ProofreaderError, TokenType, Token
 
 PUNCTUATION_NAMES = {
     ".": {"Period"},
@@ -46,8 +52,17 @@ PUNCTUATION_NAMES = {
     "€": {"EuroSign", "CurrencySign"},
 }
 
-def _tokens_to_bitstring(tokens: List[Token], included_bits: List[str]) -> str:
-    token_bitsets = []
+def _analysis_mask(analysis: Analysis) -> int:
+    if isinstance(analysis, CompactAnalysis):
+        return analysis.bits_mask(syntax_mask)
+    
+    return syntax_mask(analysis)
+
+def _token_masks(tokens: List[Token]) -> List[Tuple[int, int]]:
+    """
+    Returns for each token a pair of masks: the bits that all analyses have and the bits that any analysis has.
+    """
+    masks = []
     for token in tokens:
         if token.token_type == "PUNCT":
             bitset = {"Punct"}
@@ -57,105 +72,66 @@ def _tokens_to_bitstring(tokens: List[Token], included_bits: List[str]) -> str:
             if len(token.text) == 1:
                 bitset |= {str(ord(token.text))}
             
-            token_bitsets.append([{bit: "1" for bit in bitset}])
+            mask = bits_to_mask(bitset)
+            masks.append((mask, mask))
         
-        else:
-            token_bitsets.append([a["SYNTAX_INFO"]["BITS"] for a in token.analyses])
-
-    bitstring = ""
-    for i, token_bitset in enumerate(token_bitsets):
-        bitset = {}
-        for bit in included_bits:
-            if token_bitset and all(bit in s for s in token_bitset):
-                bitset[bit] = "1"
+        elif token.analyses:
+            all_mask = -1
+            any_mask = 0
+            for analysis in token.analyses:
+                mask = _analysis_mask(analysis)
+                all_mask &= mask
+                any_mask |= mask
             
-            elif all(bit not in s for s in token_bitset):
-                bitset[bit] = "0"
+            masks.append((all_mask, any_mask))
         
-        bitstring += "," + str(i) + ":" + _bitset_to_bitstring(bitset, included_bits)
+        else:
+            masks.append((0, 0))
     
-    return bitstring
-
-def _pattern_to_regex(pattern: str) -> Tuple[re.Pattern, List[str]]:
-    regex_parts = []
-    while pattern:
-        group_name = None
-        if m := re.match(r"\w+", pattern):
-            group_name = m.group(0)
-            pattern = pattern[len(group_name):]
-        
-        if pattern[0] == "{":
-            pattern = pattern[1:]
-            end_index = pattern.index("}")
-            bitcond = {}
-            for bit in pattern[:end_index].split(","):
-                val = "1"
-                if bit.startswith("!"):
-                    val = "0"
-                    bit = bit[1:]
-                
-                bitcond[bit] = val
-            
-            if group_name:
-                regex_parts += [f"(?P<{group_name}>"]
-                regex_parts += ["(?:", bitcond, ")"]
-                regex_parts += [")"]
-            
-            else:
-                regex_parts += ["(?:", bitcond, ")"]
-            
-            pattern = pattern[end_index+1:]
-        
-        elif pattern[0] == "(":
-            if group_name:
-                regex_parts += [f"(?P<{group_name}>"]
+    return masks
 
-            else:
-                regex_parts += ["(?:"]
-            
-            pattern = pattern[1:]
-        
-        elif not group_name and pattern[0] in "*+?|)^$":
-            regex_parts += [pattern[0]]
-            pattern = pattern[1:]
-        
-        elif pattern[0] == "." or group_name and pattern[0].isspace():
-            if group_name:
-                regex_parts += [f"(?P<{group_name}>"]
+def _condition_matches(masks: Tuple[int, int], condition: Tuple[int, int]) -> bool:
+    """
+    A condition is a pair of masks: the bits that all analyses must have and the bits that no analysis may have.
+    """
+    ones, zeros = condition
+    return masks[0] & ones == ones and not masks[1] & zeros
 
-            regex_parts += [{}]
-            if group_name:
-                regex_parts += [")"]
-            
-            pattern = pattern[1:]
-        
-        elif pattern[0].isspace():
-            pattern = pattern[1:]
-        
-        else:
-            raise Exception("Invalid pattern")
-    
-    bits = set()
-    for part in regex_parts:
-        if isinstance(part, dict):
-            bits |= set(part.keys())
+def _encode_tokens(tokens: List[Token], condition_bits: Dict[Tuple[int, int], int]) -> List[int]:
+    """
+    Encodes each token as a mask of the conditions it satisfies. Tokens with equal bit masks are evaluated only once.
+    """
+    # A condition can only hold for tokens that have its lowest required bit, so the conditions are bucketed by that bit
+    buckets: Dict[int, List[Tuple[Tuple[int, int], int]]] = {}
+    for condition, bit in condition_bits.items():
+        ones = condition[0]
+        buckets.setdefault(ones & -ones, []).append((condition, bit))
     
-    included_bits = list(bits)
-
-    regex = ""
-    for part in regex_parts:
-        if isinstance(part, str):
-            regex += part
+    unconditional = buckets.pop(0, [])
+    encoded: Dict[Tuple[int, int], int] = {}
+    encoding = []
+    for masks in _token_masks(tokens):
+        if masks not in encoded:
+            satisfied = sum(bit for condition, bit in unconditional if _condition_matches(masks, condition))
+            all_mask = masks[0]
+            while all_mask:
+                lowest = all_mask & -all_mask
+                for condition, bit in buckets.get(lowest, ()):
+                    if _condition_matches(masks, condition):
+                        satisfied |= bit
+                
+                all_mask ^= lowest
+            
+            encoded[masks] = satisfied
         
-        elif isinstance(part, dict):
-            regex += r",\d+:" + _bitset_to_bitstring(part, included_bits)
+        encoding.append(encoded[masks])
     
-    return re.compile(regex), included_bits
+    return encoding
 
 class GrammarRule(NamedTuple):
     name: str
     pattern: str
-    re_pattern: re.Pattern
+    token_pattern: TokenPattern
     included_bits: List[str]
     message: str
     replacement: Optional[str]
@@ -165,12 +141,12 @@ class GrammarRule(NamedTuple):
     @staticmethod
     def from_dict(d={}, **d2) -> "GrammarRule":
         d = {**d, **d2}
-        pattern, included_bits = _pattern_to_regex(d["pattern"])
+        token_pattern = TokenPattern(d["pattern"])
         return GrammarRule(
             name=d["name"],
             pattern=d["pattern"],
-            re_pattern=pattern,
-            included_bits=included_bits,
+            token_pattern=token_pattern,
+            included_bits=token_pattern.included_bits,
             message=d["message"],
             replacement=d.get("replacement"),
             positive_examples=d.get("positive_examples", []),
@@ -258,6 +234,65 @@ GRAMMAR_RULES: List[GrammarRule] = [
     ),
 ]
 
+RULE_CACHE_DIR = DATA_DIR / "rules"
+RULE_CACHE_FORMAT = 1
+
+def _parse_rule_pack(path: Path, content: bytes) -> List[dict]:
+    if path.suffix == ".toml":
+        try:
+            import tomllib
+        
+        except ImportError:
+            try:
+                import tomli as tomllib
+            
+            except ImportError:
+                raise ImportError("Reading TOML rule packs requires Python 3.11 or the tomli package")
+        
+        data = tomllib.loads(content.decode("utf-8"))
+    
+    else:
+        data = json.loads(content.decode("utf-8"))
+    
+    if isinstance(data, dict):
+        data = data.get("rules", [])
+    
+    if not isinstance(data, list) or not all(isinstance(rule, dict) for rule in data):
+        raise ValueError(f"{path}: a rule pack must be a list of rules or contain a list called rules")
+    
+    return data
+
+def load_rule_pack(path: Union[str, Path]) -> List[GrammarRule]:
+    """
+    Loads grammar rules from a JSON or TOML rule pack. Each rule has the same fields as the built-in rules: name, pattern, message and optionally replacement, positive_examples and negative_examples.
+
+    A JSON pack is either a list of rules or an object with a `rules` list. A TOML pack contains a `[[rules]]` table for each rule.
+
+    The compiled rules are cached on disk by the hash of the file content, so loading an unchanged pack does not compile its patterns again.
+    """
+    path = Path(path)
+    content = path.read_bytes()
+    key = {
+        "format": RULE_CACHE_FORMAT,
+        "yajwiz": __version__,
+        "sha256": hashlib.sha256(content).hexdigest(),
+    }
+    cache_path = RULE_CACHE_DIR / (key["sha256"] + ".pickle")
+    # The rules are cached as dicts, because the module of GrammarRule is __main__ when this file is run as a script
+    if cached := _load_snapshot(cache_path, key):
+        return [GrammarRule(**fields) for fields in cached[1]]
+    
+    rules = []
+    for i, rule in enumerate(_parse_rule_pack(path, content)):
+        try:
+            rules.append(GrammarRule.from_dict(rule))
+        
+        except Exception as e:
+            raise ValueError(f"{path}: invalid rule {rule.get('name', i+1)!r}: {e!r}") from e
+    
+    _save_snapshot(cache_path, key, [rule._asdict() for rule in rules])
+    return rules
+
 def _replace_groups(tokens: List[Token], groups: Dict[str, List[int]], text: str) -> str:
     for g in groups:
         if f"${g}" in text:
@@ -266,7 +301,12 @@ def _replace_groups(tokens: List[Token], groups: Dict[str, List[int]], text: str
     
     return text
 
-def proofread_tokens(tokens: List[Token], rules=GRAMMAR_RULES) -> List[ProofreaderError]:
+def proofread_tokens(tokens: List[Token], rules=GRAMMAR_RULES, overlapping=False, at_start=True, at_end=True) -> List[ProofreaderError]:
+    """
+    Returns the errors found in the tokens. Every non-overlapping match of each rule is reported, or every match if `overlapping` is true.
+
+    `at_start` and `at_end` tell whether the tokens begin and end the text, ie. whether `^` and `$` can match at their ends.
+    """
     errors = []
     for token in tokens:
         if token.token_type == "WORD":
@@ -278,13 +318,48 @@ def proofread_tokens(tokens: List[Token], rules=GRAMMAR_RULES) -> List[Proofread
             elif all(a.get("UNGRAMMATICAL", None) for a in token.analyses):
                 errors.append(ProofreaderError("ungrammatical", token.analyses[0]["UNGRAMMATICAL"], token.location, token.end_location()))
     
+    # The tokens are encoded once against the conditions of all rules
+    condition_bits: Dict[Tuple[int, int], int] = {}
     for rule in rules:
-        bitstring = _tokens_to_bitstring(tokens, rule.included_bits)
-        #print(rule.included_bits)
-        #print(rule.re_pattern)
-        #print(bitstring)
-        if m := rule.re_pattern.search(bitstring):
-            groups = {key: [int(t[1:-1]) for t in re.findall(r",\d+:", value)] for key, value in m.groupdict().items()}
+        for condition in rule.token_pattern.conditions:
+            condition_bits.setdefault(condition, 1 << len(condition_bits))
+    
+    profile = profiling.PROFILE
+    if profile:
+        profile.documents += 1
+        profile.tokens += len(tokens)
+        encode_start = time.perf_counter()
+    
+    encoding = _encode_tokens(tokens, condition_bits)
+    present = reduce(lambda a, b: a | b, encoding, 0)
+    
+    if profile:
+        encode_seconds = time.perf_counter() - encode_start
+        profile.encode_seconds += encode_seconds
+        condition_count = sum(len(rule.token_pattern.conditions) for rule in rules) or 1
+    
+    for rule in rules:
+        if profile:
+            stats = profile.rule(rule.name)
+            stats.documents += 1
+            stats.encode_seconds += encode_seconds * len(rule.token_pattern.conditions) / condition_count
+            match_start = time.perf_counter()
+            error_count = len(errors)
+        
+        rule_bits = [condition_bits[condition] for condition in rule.token_pattern.conditions]
+        if not all(present & sum(bit for i, bit in enumerate(rule_bits) if clause >> i & 1) for clause in rule.token_pattern.required_conditions):
+            if profile:
+                stats.skipped += 1
+                stats.match_seconds += time.perf_counter() - match_start
+            
+            continue
+        
+        reported = set()
+        for m in rule.token_pattern.finditer(encoding, rule_bits, overlapping=overlapping, at_start=at_start, at_end=at_end):
+            if profile:
+                stats.matches += 1
+            
+            groups = {key: list(range(*span)) for key, span in m.groups.items()}
             #print(groups)
 
             replacement = rule.replacement
@@ -292,22 +367,31 @@ def proofread_tokens(tokens: List[Token], rules=GRAMMAR_RULES) -> List[Proofread
                 replacement = _replace_groups(tokens, groups, replacement)
             
             message = _replace_groups(tokens, groups, rule.message)
-            if "error" in groups:
+            if groups.get("error"):
                 span = groups["error"]
             
             else:
-                span = [int(t[1:-1]) for t in re.findall(r",\d+:", m.group(0))]
+                span = list(range(*m.span))
             
             start, end = tokens[span[0]].location, tokens[span[-1]].end_location()
+            # Overlapping matches often point to the same error
+            if (start, end) in reported:
+                continue
+            
+            reported.add((start, end))
             errors.append(ProofreaderError(rule.name, message, start, end, replacement=replacement))
+        
+        if profile:
+            stats.errors += len(errors) - error_count
+            stats.match_seconds += time.perf_counter() - match_start
 
     return errors
 
-def test_grammar_rules():
+def test_grammar_rules(rules: List[GrammarRule] = GRAMMAR_RULES):
     from . import analyzer
     succ = 0
     fail = 0
-    for rule in GRAMMAR_RULES:
+    for rule in rules:
         examples: List[Tuple[str, str]] = [("Positive", example) for example in rule.positive_examples]
         examples += [("Negative", example) for example in rule.negative_examples]
         for example_type, example in examples:
@@ -338,4 +422,11 @@ def test_grammar_rules():
     print(f"Result: {succ} ok, {fail} failed")
 
 if __name__ == "__main__":
-    test_grammar_rules()
+    import sys
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            print(path)
+            test_grammar_rules(load_rule_pack(path))
+    
+    else:
+        test_grammar_rules()
@@ -0,0 +1,410 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from .tables import PREFIX_TABLE, SUFFIX_TYPES
+
+# A small matching engine for Klingon words. It replaces the huge lemma alternations of the analyzer regexes with a trie
+# and the suffix groups with a sequence of slots. The pattern is compiled to a state machine whose transitions are tried
+# in the same order as the regex engine would try them, so `Matcher.fullmatch` returns exactly the same groups as
+# `re.Pattern.fullmatch`. States that cannot reach the end of the word are memoized, so a word is never analyzed twice
+# from the same state and position.
+
+Groups = List[Optional[str]]
+Condition = Optional[Callable[[str, int], bool]]
+
+LOOKBEHIND_CONSONANTS = set("bDHjqlmnpQrStvwy'hg")
+
+PRONOUNS = ["jIH", "maH", "SoH", "tlhIH", "ghaH", "chaH", "'oH", "bIH"]
+NUMBERS = ["wa'", "cha'", "wej", "loS", "vagh", "jav", "Soch", "chorgh", "Hut"]
+NOMINALIZERS = ["wI'", "ghach"]
+
+def _suffixes(suffix_type: str, pos: str) -> List[str]:
+    return [suffix[1:] for (suffix, suffix_pos), t in SUFFIX_TYPES.items() if t == suffix_type and suffix_pos == pos]
+
+def verb_prefixes() -> List[str]:
+    """
+    Returns the verb prefixes in the order the analyzer tries them. The first prefix is the empty prefix.
+    """
+    return [""] + [prefix[:-1] for (prefix, voice) in PREFIX_TABLE if voice == "P" and prefix != "-"]
+
+# Pattern descriptions
+
+class Slot(NamedTuple):
+    """
+    A capturing group that contains an alternation of morphemes. Each morpheme may have a condition that checks its context.
+    """
+    alternatives: List[Tuple[str, Condition]]
+    optional: bool = True
+
+class Lemmas(NamedTuple):
+    """
+    A capturing group that contains an alternation of lemmas. Lemmas are tried in the order of the list.
+    """
+    words: Sequence[str]
+
+class Sequence_(NamedTuple):
+    items: list
+
+class Alternation(NamedTuple):
+    items: list
+    optional: bool = False
+
+Pattern = Union[Slot, Lemmas, Sequence_, Alternation]
+
+def slot(alternatives: List[str], optional: bool = True) -> Slot:
+    return Slot([(alternative, None) for alternative in alternatives], optional)
+
+def _count_groups(pattern: Pattern) -> int:
+    if isinstance(pattern, (Slot, Lemmas)):
+        return 1
+
+    return sum(_count_groups(item) for item in pattern.items)
+
+def _endings(pattern: Pattern) -> Optional[Tuple[str, ...]]:
+    """
+    Returns the texts that every match of the pattern ends with one of, or None if a match can end with anything.
+    """
+    if isinstance(pattern, Slot):
+        return None if pattern.optional else tuple(text for text, _condition in pattern.alternatives)
+
+    elif isinstance(pattern, Lemmas) or not pattern.items:
+        return None
+
+    elif isinstance(pattern, Sequence_):
+        return _endings(pattern.items[-1])
+
+    endings = [_endings(item) for item in pattern.items]
+    if pattern.optional or None in endings:
+        return None
+
+    return tuple(text for texts in endings for text in texts)
+
+# State machine
+
+_TRIE = 0
+_TEXT = 1
+
+class _State:
+    __slots__ = ("id", "edges", "accepting", "next_edges")
+
+    def __init__(self, id: int, accepting: bool = False):
+        self.id = id
+        self.edges: List[tuple] = []
+        self.accepting = accepting
+        self.next_edges: Dict[str, Tuple["_State", List[tuple]]] = {}
+
+    def alphabet(self) -> Set[str]:
+        chars = set()
+        for kind, text, _condition, _group, _target in self.edges:
+            chars |= set(key for key in text if key) if kind == _TRIE else set(text[:1])
+
+        return chars
+
+    def viable_edges(self, char: str) -> List[tuple]:
+        """
+        Returns the edges that can be followed if the next character is `char` (or the word ends if `char` is empty).
+        """
+        edges = []
+        for edge in self.edges:
+            kind, text, _condition, _group, _target = edge
+            if kind == _TRIE and (None in text or char in text) or kind == _TEXT and (not text or text[0] == char):
+                edges.append(edge)
+
+        return edges
+
+    def index_edges(self, alphabet: Set[str]):
+        # For each possible next character, precompute the edges that can be followed in priority order.
+        # Optional slots that cannot match the character are skipped right away.
+        for char in alphabet | {""}:
+            state = self
+            edges = state.viable_edges(char)
+            while len(edges) == 1 and edges[0][0] == _TEXT and not edges[0][1] and edges[0][3] is None:
+                state = edges[0][4]
+                edges = state.viable_edges(char)
+
+            self.next_edges[char] = (state, edges)
+
+def _build_trie(words: Sequence[str]) -> dict:
+    root: dict = {}
+    for index, word in enumerate(words):
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+
+        node.setdefault(None, index)
+
+    return root
+
+def _trie_ends(root: dict, word: str, pos: int) -> List[int]:
+    candidates = []
+    node = root
+    end = pos
+    while True:
+        if None in node:
+            candidates.append((node[None], end))
+
+        if end == len(word) or word[end] not in node:
+            break
+
+        node = node[word[end]]
+        end += 1
+
+    candidates.sort()
+    return [end for _index, end in candidates]
+
+class _Compiler:
+    # The pattern is compiled from right to left, so each part knows the state that follows it.
+    # Group numbers are assigned in decreasing order, which matches the left-to-right numbering of regex groups.
+
+    def __init__(self, group_count: int):
+        self.next_group = group_count
+        self.states: List[_State] = []
+
+    def state(self, accepting: bool = False) -> _State:
+        state = _State(len(self.states), accepting)
+        self.states.append(state)
+        return state
+
+    def compile(self, pattern: Pattern, target: _State) -> _State:
+        if isinstance(pattern, Slot):
+            self.next_group -= 1
+            state = self.state()
+            state.edges = [(_TEXT, text, condition, self.next_group, target) for text, condition in pattern.alternatives]
+            if pattern.optional:
+                state.edges.append((_TEXT, "", None, None, target))
+
+            return state
+
+        elif isinstance(pattern, Lemmas):
+            self.next_group -= 1
+            state = self.state()
+            state.edges = [(_TRIE, _build_trie(pattern.words), None, self.next_group, target)]
+            return state
+
+        elif isinstance(pattern, Sequence_):
+            for item in reversed(pattern.items):
+                target = self.compile(item, target)
+
+            return target
+
+        else:
+            starts = [self.compile(item, target) for item in reversed(pattern.items)]
+            state = self.state()
+            state.edges = [(_TEXT, "", None, None, start) for start in reversed(starts)]
+            if pattern.optional:
+                state.edges.append((_TEXT, "", None, None, target))
+
+            return state
+
+class Match:
+    """
+    The result of a successful `Matcher.fullmatch`. Compatible with the parts of `re.Match` used by the analyzer.
+    """
+
+    __slots__ = ("_groups",)
+
+    def __init__(self, groups: Tuple[Optional[str], ...]):
+        self._groups = groups
+
+    def groups(self) -> Tuple[Optional[str], ...]:
+        return self._groups
+
+class Matcher:
+    """
+    Matches whole words against a morphological pattern.
+    """
+
+    def __init__(self, pattern: Pattern):
+        self.group_count = _count_groups(pattern)
+        compiler = _Compiler(self.group_count)
+        self.start = compiler.compile(pattern, compiler.state(accepting=True))
+        self.state_count = len(compiler.states)
+        # Words that do not end with a required suffix are rejected before the search
+        self.endings = _endings(pattern)
+        alphabet = set().union(*(state.alphabet() for state in compiler.states))
+        for state in compiler.states:
+            state.index_edges(alphabet)
+
+    def _search(self, state: _State, word: str, pos: int, groups: Groups, dead: Set[int], results: list, first_only: bool) -> bool:
+        length = len(word)
+        state, edges = state.next_edges.get(word[pos] if pos < length else "") or state.next_edges[""]
+
+        key = state.id * (length + 1) + pos
+        if key in dead:
+            return False
+
+        found = False
+        if state.accepting and pos == length:
+            results.append(tuple(groups))
+            found = True
+
+        for kind, text, condition, group, target in edges:
+            if found and first_only:
+                break
+
+            if kind == _TRIE:
+                for end in _trie_ends(text, word, pos):
+                    groups[group] = word[pos:end]
+                    found |= self._search(target, word, end, groups, dead, results, first_only)
+                    groups[group] = None
+                    if found and first_only:
+                        break
+
+            elif word.startswith(text, pos) and (condition is None or condition(word, pos)):
+                if group is None:
+                    found |= self._search(target, word, pos + len(text), groups, dead, results, first_only)
+
+                else:
+                    groups[group] = text
+                    found |= self._search(target, word, pos + len(text), groups, dead, results, first_only)
+                    groups[group] = None
+
+        if not found:
+            dead.add(key)
+
+        return found
+
+    def segmentations(self, word: str) -> List[Tuple[Optional[str], ...]]:
+        """
+        Returns all segmentations of the word as tuples of groups, in the order of preference of the regex engine.
+        """
+        results: list = []
+        if self.endings is None or word.endswith(self.endings):
+            self._search(self.start, word, 0, [None] * self.group_count, set(), results, False)
+
+        return results
+
+    def fullmatch(self, word: str) -> Optional[Match]:
+        results: list = []
+        if self.endings is not None and not word.endswith(self.endings):
+            return None
+
+        if self._search(self.start, word, 0, [None] * self.group_count, set(), results, True):
+            return Match(results[0])
+
+        return None
+
+# Patterns of the analyzer
+
+def _noun_suffixes() -> List[Pattern]:
+    n1 = []
+    for suffix in _suffixes("N1", "n"):
+        condition: Condition = None
+        if suffix == "oy":
+            condition = lambda word, pos: pos > 0 and word[pos-1] in LOOKBEHIND_CONSONANTS
+
+        elif suffix == "'oy":
+            condition = lambda word, pos: pos == 0 or word[pos-1] not in LOOKBEHIND_CONSONANTS
+
+        n1.append((suffix, condition))
+
+    return [Slot(n1)] + [slot(_suffixes(t, "n")) for t in ["N2", "N3", "N4", "N5"]]
+
+def _verb_suffixes() -> List[Pattern]:
+    rovers = [suffix for suffix in _suffixes("VR", "v") if suffix != "Ha'"]
+    items: List[Pattern] = [slot(["Ha'"]), slot(rovers)]
+    for suffix_type in ["V1", "V2", "V3", "V4", "V5", "V6", "V7", "V8"]:
+        items += [slot(_suffixes(suffix_type, "v")), slot(rovers)]
+
+    items.append(slot(_suffixes("VQ", "v")))
+
+    v9 = slot([suffix for suffix in _suffixes("V9", "v") if suffix not in NOMINALIZERS], optional=False)
+    nominalizer = Sequence_([slot(NOMINALIZERS, optional=False)] + _noun_suffixes())
+    items.append(Alternation([v9, nominalizer], optional=True))
+    return items
+
+def noun_matcher(nouns: Sequence[str]) -> Matcher:
+    """
+    Equivalent to `NOUN_REGEX` of the analyzer.
+    """
+    return Matcher(Sequence_([Lemmas(nouns)] + _noun_suffixes()))
+
+def verb_matcher(verbs: Sequence[str]) -> Matcher:
+    """
+    Equivalent to `VERB_REGEX` of the analyzer.
+    """
+    return Matcher(Sequence_([slot(verb_prefixes(), optional=False), Lemmas(verbs)] + _verb_suffixes()))
+
+def pronoun_verb_matcher() -> Matcher:
+    """
+    Equivalent to `PRONOUN_VERB_REGEX` of the analyzer.
+    """
+    return Matcher(Sequence_([slot(PRONOUNS, optional=False)] + _verb_suffixes()))
+
+def stative_verb_matcher(stative_verbs: Sequence[str]) -> Matcher:
+    """
+    Equivalent to `STATIVE_VERB_REGEX` of the analyzer.
+    """
+    return Matcher(Sequence_([
+        Lemmas(stative_verbs),
+        slot(["Ha'"]),
+        slot(["be'"]),
+        slot(["qu'"]),
+        slot(["be'"]),
+        slot(_suffixes("N5", "n"), optional=False),
+    ]))
+
+def number_matcher() -> Matcher:
+    """
+    Equivalent to `NUMBER_REGEX` of the analyzer.
+    """
+    with_multiplier = Sequence_([slot(_suffixes("L1", "n"), optional=False), slot(_suffixes("L2", "n"))])
+    without_multiplier = Sequence_([slot(_suffixes("L1", "n")), slot(_suffixes("L2", "n"), optional=False)])
+    return Matcher(Sequence_([slot(NUMBERS, optional=False), Alternation([with_multiplier, without_multiplier])]))
+
+def _test_words(lemmas: Sequence[str]) -> List[str]:
+    prefixes = verb_prefixes()
+    verb_suffixes = ["", "Ha'", "be'", "qu'", "Ha'be'", "'egh", "chuqqu'", "nISbe'", "choH", "qa'", "moH", "lu'", "laH", "chu'", "law'", "pu'", "ta'",
+        "taH", "lI'", "neS", "Qo'", "DI'", "vIS", "bogh", "meH", "'a'", "jaj", "wI'", "ghach", "wI'pu'", "ghachmey", "Daq", "'e'", "lu'pu'bogh",
+        "taHvIS", "moHlaHbe'", "be'qu'", "qu'be'", "'eghmoHlu'taHvIS", "wI'pu'wIjDaq"]
+    noun_suffixes = ["'a'", "Hom", "oy", "'oy", "pu'", "Du'", "mey", "qoq", "Hey", "na'", "wI'", "wIj", "chaj", "vam", "vetlh", "Daq", "vo'",
+        "mo'", "vaD", "'e'", "meyDaq", "'a'meywIjDaq", "Homna'"]
+    words = []
+    for i, lemma in enumerate(lemmas):
+        words.append(lemma)
+        words += [lemma + suffix for suffix in noun_suffixes]
+        words += [prefixes[(i + j) % len(prefixes)] + lemma + suffix for j, suffix in enumerate(verb_suffixes)]
+
+    for number in NUMBERS:
+        for suffix in _suffixes("L1", "n") + _suffixes("L2", "n"):
+            words += [number + suffix, number + suffix + "DIch", number + suffix + "maH"]
+
+    return words
+
+def test_morphology():
+    """
+    Checks that the matchers return exactly the same groups as the analyzer regexes for the whole dictionary.
+    """
+    from . import analyzer
+    analyzer.warmup()
+    analyzer._create_regexes()
+
+    pairs = [
+        (analyzer.NOUN_REGEX, analyzer.NOUN_MATCHER),
+        (analyzer.VERB_REGEX, analyzer.VERB_MATCHER),
+        (analyzer.STATIVE_VERB_REGEX, analyzer.STATIVE_VERB_MATCHER),
+        (analyzer.PRONOUN_VERB_REGEX, analyzer.PRONOUN_VERB_MATCHER),
+        (analyzer.NUMBER_REGEX, analyzer.NUMBER_MATCHER),
+    ]
+
+    succ = 0
+    fail = 0
+    for word in _test_words(sorted(analyzer.ALL_WORDS) + PRONOUNS):
+        for regex, matcher in pairs:
+            m1 = regex.fullmatch(word)
+            m2 = matcher.fullmatch(word)
+            g1 = m1.groups() if m1 else None
+            g2 = m2.groups() if m2 else None
+            if g1 == g2:
+                succ += 1
+
+            else:
+                print(word)
+                print("regex:  ", g1)
+                print("matcher:", g2)
+                print()
+                fail += 1
+
+    print(f"Result: {succ} ok, {fail} failed")
+
+if __name__ == "__main__":
+    test_morphology()
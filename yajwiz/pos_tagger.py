@@ -1,33 +1,86 @@
+from array import array
 from collections import defaultdict, Counter
+import json
 import math
+from pathlib import Path
 from re import T
+import sys
 
-from .analyzer import XPOS_INDEX, text_to_conllu_without_tagger, tokenize, analyze, _word_to_conllu
+from .analyzer import XPOS_INDEX, tokenize, warmup
+from .boqwiz import _write_atomically
+from .conllu import ConlluSentence, read_conllu
+from .doc import Doc
 
-from typing import List, Tuple, Optional
+from typing import BinaryIO, Collection, DefaultDict, Dict, Iterable, Iterator, List, NamedTuple, TextIO, Tuple, Optional, Union
 
-def conllu_to_tagged_list(conllu_text: str) -> List[List[Tuple[str, Optional[str]]]]:
-    sentences = []
-    for line in conllu_text.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
+def iter_tagged_sentences(conllu: Union[str, TextIO, Iterable[str]]) -> Iterator[List[Tuple[str, Optional[str]]]]:
+    """
+    Reads (lemma, XPOS) pairs from CONLL-U text or a file one sentence at a time. The form is used when the lemma is unknown, and
+    the XPOS is None when it is unknown.
+    """
+    if isinstance(conllu, str):
+        conllu = conllu.split("\n")
+    
+    for sentence in read_conllu(conllu):
+        words = [(word.lemma if word.lemma != "_" else word.form, word.xpos if word.xpos != "_" else None) for word in sentence.words]
+        if words:
+            yield words
 
-        fields = line.split("\t")
-        num = int(fields[0])
-        form = fields[1]
-        lemma = fields[2]
-        _upos = fields[3]
-        xpos = fields[4]
+def conllu_to_tagged_list(conllu_text: Union[str, TextIO]) -> List[List[Tuple[str, Optional[str]]]]:
+    return list(iter_tagged_sentences(conllu_text))
 
-        if num == 1:
-            sentences.append([])
-        
-        sentences[-1].append((lemma if lemma != "_" else form, xpos if xpos != "_" else None))
+END_TOKEN: Tuple[str, Optional[str]] = ("$", "$")
+
+TAGGER_FILE_FORMAT = "yajwiz-tagger"
+TAGGER_FILE_VERSION = 2
+
+# The log-probability of words and tag sequences that were never seen in the training data
+UNSEEN_LOG_PROB = -1000.0
+
+class TaggerModel(NamedTuple):
+    """
+    The probabilities of a trained tagger in a form that is fast to look up. Tags and words are mapped to integer ids, and the id
+    `len(tag_names)` stands for all tags that were not seen in the training data.
+
+    `tag_log_probs` contains rows of log P(tag1 | tag2, tag3) indexed by tag1. There is a row for each tag2, used when the
+    tags tag2, tag3 were never seen together, and `context_rows` maps the id pairs that were seen, `tag2 * len(tag_names) + tag3`,
+    to their rows. The tags of each word and their log-probabilities are stored in `word_tags` and `word_log_probs` in the
+    range `word_offsets[word]..word_offsets[word+1]-1`, sorted by tag id.
+    """
+    tag_names: List[Optional[str]]
+    tag_ids: Dict[Optional[str], int]
+    tag_log_probs: array
+    context_rows: Dict[int, int]
+    word_ids: Dict[str, int]
+    word_offsets: array
+    word_tags: array
+    word_log_probs: array
+    fallback_log_probs: Dict[int, float]
+    free_tags: List[int]
+
+def _compact_array(values: List[int]) -> array:
+    """
+    Returns the non-negative integers in an array of the smallest type that can hold them.
+    """
+    largest = max(values, default=0)
+    for typecode in ["B", "H", "I", "L", "Q"]:
+        if largest < 1 << 8 * array(typecode).itemsize:
+            return array(typecode, values)
     
-    return sentences
+    raise OverflowError(f"{largest} is too large to be stored in an array")
 
-END_TOKEN: Tuple[str, Optional[str]] = ("$", "$")
+def _columns(rows: Iterator[Tuple[int, ...]]) -> Tuple[array, ...]:
+    return tuple(_compact_array(list(column)) for column in zip(*rows))
+
+def _typecode(typecode: str, itemsize: int) -> str:
+    """
+    Returns a typecode of the same kind as `typecode` whose items have the given size on this platform.
+    """
+    for candidate in ["d"] if typecode == "d" else ["B", "H", "I", "L", "Q"]:
+        if array(candidate).itemsize == itemsize:
+            return candidate
+    
+    raise ValueError(f"arrays of type {typecode} with {itemsize}-byte items are not supported")
 
 class Tagger:
     """
@@ -35,50 +88,399 @@ class Tagger:
     """
 
     def __init__(self):
-        self.word_dist = defaultdict(Counter)
-        self.tag_dist1 = defaultdict(Counter)
-        self.tag_dist2 = defaultdict(Counter)
+        self._word_dist = defaultdict(Counter)
+        self._tag_dist1 = defaultdict(Counter)
+        self._tag_dist2 = defaultdict(Counter)
         self.tags = set()
+        self._model: Optional[TaggerModel] = None
+        # The encoded counts of a loaded tagger, which are decoded only when they are needed
+        self._saved_counts: Optional[dict] = None
+    
+    def _decode_counts(self):
+        data = self._saved_counts
+        if not data:
+            return
+        
+        self._saved_counts = None
+        tag_names = data["tag_names"]
+        words = data["words"]
+        for tag, word, count in zip(*data["word_counts"]):
+            self._word_dist[tag_names[tag]][words[word]] = count
+        
+        for tag2, tag1, count in zip(*data["bigram_counts"]):
+            self._tag_dist1[tag_names[tag2]][tag_names[tag1]] = count
+        
+        for tag2, tag3, tag1, count in zip(*data["trigram_counts"]):
+            self._tag_dist2[(tag_names[tag2], tag_names[tag3])][tag_names[tag1]] = count
+    
+    @property
+    def word_dist(self) -> DefaultDict[str, Counter]:
+        self._decode_counts()
+        return self._word_dist
+    
+    @property
+    def tag_dist1(self) -> DefaultDict[str, Counter]:
+        self._decode_counts()
+        return self._tag_dist1
+    
+    @property
+    def tag_dist2(self) -> DefaultDict[Tuple[str, Optional[str]], Counter]:
+        self._decode_counts()
+        return self._tag_dist2
     
     def train(self, sentences: List[List[Tuple[str, Optional[str]]]]):
-        for s in sentences:
-            for (l1, p1), (_l2, p2), (_l3, p3) in zip(s, s[1:]+[END_TOKEN], s[2:]+[END_TOKEN, END_TOKEN]):
-                if p1:
-                    self.word_dist[p1][l1] += 1
-                    if p2:
-                        self.tag_dist1[p2][p1] += 1
-                        self.tag_dist2[(p2, p3)][p1] += 1
+        """
+        Adds the counts of the sentences to the tagger. Training many times is the same as training once with all the sentences.
+        """
+        self.partial_fit(sentences)
+    
+    def partial_fit(self, sentences: Iterable[List[Tuple[str, Optional[str]]]]) -> "Tagger":
+        """
+        Adds the counts of a batch of sentences to the tagger and returns the tagger.
+        """
+        self._decode_counts()
+        self._model = None
+        # Each distinct (word, tag, next tag, tag after that) is counted in one pass, and the distributions are updated once per distinct tuple
+        counts = Counter(
+            (l1, p1, p2, p3)
+            for s in sentences
+            for (l1, p1), (_l2, p2), (_l3, p3) in zip(s, s[1:]+[END_TOKEN], s[2:]+[END_TOKEN, END_TOKEN])
+            if p1
+        )
+        for (l1, p1, p2, p3), count in counts.items():
+            self.word_dist[p1][l1] += count
+            if p2:
+                self.tag_dist1[p2][p1] += count
+                self.tag_dist2[(p2, p3)][p1] += count
 
-                    self.tags.add(p1)
+            self.tags.add(p1)
+        
+        return self
     
-    def _get_word_prob(self, word, tag):
-        p = self.word_dist[tag][word]
-        t = sum(self.word_dist[tag].values())
-        if p == 0 and word in XPOS_INDEX[tag] and tag in {"ADV", "CONJ"}:
-            p = t / len(self.word_dist[tag])
+    def merge(self, other: "Tagger") -> "Tagger":
+        """
+        Adds the counts of another tagger to this one and returns this tagger. A tagger merged from taggers trained with parts of a
+        corpus is identical to a tagger trained with the whole corpus.
+        """
+        self._decode_counts()
+        self._model = None
+        for tag, dist in other.word_dist.items():
+            self.word_dist[tag].update(dist)
+        
+        for tag2, dist in other.tag_dist1.items():
+            self.tag_dist1[tag2].update(dist)
+        
+        for context, dist in other.tag_dist2.items():
+            self.tag_dist2[context].update(dist)
+        
+        self.tags |= other.tags
+        return self
+    
+    def finalize(self) -> TaggerModel:
+        """
+        Precomputes the log-probabilities of the trained model. This is done automatically when the tagger is first used after training.
+        """
+        if self._model:
+            return self._model
+        
+        names = set(self.tags) | set(self.word_dist) | set(self.tag_dist1)
+        for (tag2, tag3), dist in self.tag_dist2.items():
+            names |= {tag2, tag3} | set(dist)
+        
+        for dist in self.tag_dist1.values():
+            names |= set(dist)
+        
+        # None is the tag of untagged words, which can follow tagged words in the training data
+        tag_names: List[Optional[str]] = sorted(name for name in names if name)
+        if None in names:
+            tag_names.append(None)
+        
+        tag_ids = {name: i for i, name in enumerate(tag_names)}
+        n = len(tag_names) + 1
+
+        def row(dist: Counter) -> array:
+            log_probs = array("d", [UNSEEN_LOG_PROB]) * n
+            total = sum(dist.values())
+            for tag, count in dist.items():
+                if count:
+                    log_probs[tag_ids[tag]] = math.log(count / total)
+            
+            return log_probs
+
+        tag_log_probs = array("d", [UNSEEN_LOG_PROB]) * (n * n)
+        for tag2, dist in self.tag_dist1.items():
+            if sum(dist.values()):
+                tag_log_probs[tag_ids[tag2] * n:(tag_ids[tag2] + 1) * n] = row(dist)
+        
+        context_rows = {}
+        for (tag2, tag3), dist in sorted(self.tag_dist2.items(), key=lambda item: (tag_ids[item[0][0]], tag_ids.get(item[0][1], n - 1))):
+            if sum(dist.values()):
+                context_rows[tag_ids[tag2] * n + tag_ids.get(tag3, n - 1)] = n + len(context_rows)
+                tag_log_probs += row(dist)
+        
+        word_tags: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for tag in tag_names:
+            dist = self.word_dist.get(tag, Counter())
+            total = sum(dist.values())
+            for word, count in dist.items():
+                if count:
+                    word_tags[word].append((tag_ids[tag], math.log(count / total)))
+        
+        word_ids = {}
+        word_offsets = array("L", [0])
+        word_tag_ids = array("I")
+        word_log_probs = array("d")
+        # The words are sorted so that the model does not depend on the order of the training data
+        for word, tags in sorted(word_tags.items()):
+            word_ids[word] = len(word_ids)
+            word_tag_ids.extend(tag for tag, _log_prob in tags)
+            word_log_probs.extend(log_prob for _tag, log_prob in tags)
+            word_offsets.append(len(word_tag_ids))
+        
+        # Adverbs and conjunctions of the dictionary that were not seen in the training data are treated as if they had been seen once
+        fallback_log_probs = {tag_ids[tag]: math.log(1 / len(self.word_dist[tag])) for tag in ["ADV", "CONJ"] if self.word_dist.get(tag)}
 
-        return -1000 if p == 0 else math.log(p / t)
+        self._model = TaggerModel(
+            tag_names=tag_names,
+            tag_ids=tag_ids,
+            tag_log_probs=tag_log_probs,
+            context_rows=context_rows,
+            word_ids=word_ids,
+            word_offsets=word_offsets,
+            word_tags=word_tag_ids,
+            word_log_probs=word_log_probs,
+            fallback_log_probs=fallback_log_probs,
+            free_tags=[tag_ids[tag] for tag in tag_names if tag in self.tags and "." not in tag],
+        )
+        return self._model
+    
+    def save(self, path: Union[str, Path]):
+        """
+        Saves the tagger to a file. The counts are stored as arrays of integer ids, together with the precomputed model.
+
+        The file starts with a line of JSON that contains the vocabularies and describes the arrays, which follow it as raw bytes.
+        """
+        model = self.finalize()
+        tag_ids = model.tag_ids
+        word_ids = model.word_ids
+        word_counts = _columns((tag_ids[tag], word_ids[word], count) for tag, dist in self.word_dist.items() for word, count in dist.items() if count)
+        bigram_counts = _columns((tag_ids[tag2], tag_ids[tag1], count) for tag2, dist in self.tag_dist1.items() for tag1, count in dist.items() if count)
+        trigram_counts = _columns((tag_ids[tag2], tag_ids[tag3], tag_ids[tag1], count) for (tag2, tag3), dist in self.tag_dist2.items() for tag1, count in dist.items() if count)
+        
+        arrays = [
+            ("tag_log_probs", model.tag_log_probs),
+            ("word_offsets", model.word_offsets),
+            ("word_tags", model.word_tags),
+            ("word_log_probs", model.word_log_probs),
+        ]
+        for name, columns in [("word_counts", word_counts), ("bigram_counts", bigram_counts), ("trigram_counts", trigram_counts)]:
+            arrays += [(f"{name}.{i}", column) for i, column in enumerate(columns)]
+        
+        # The vocabularies of the model are stored only once
+        header = {
+            "format": TAGGER_FILE_FORMAT,
+            "version": TAGGER_FILE_VERSION,
+            "byteorder": sys.byteorder,
+            "tag_names": model.tag_names,
+            "words": list(word_ids),
+            "tags": sorted(tag_ids[tag] for tag in self.tags),
+            "context_rows": list(model.context_rows.items()),
+            "fallback_log_probs": list(model.fallback_log_probs.items()),
+            "free_tags": model.free_tags,
+            "arrays": [[name, values.typecode, values.itemsize, len(values)] for name, values in arrays],
+        }
+        
+        def write(f: BinaryIO):
+            f.write(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+            for _name, values in arrays:
+                f.write(values.tobytes())
+        
+        _write_atomically(Path(path), write)
+    
+    @staticmethod
+    def load(path: Union[str, Path]) -> "Tagger":
+        """
+        Loads a tagger saved with `save`.
+        """
+        with open(path, "rb") as f:
+            try:
+                header = json.loads(f.readline().decode("utf-8"))
+            
+            except ValueError:
+                header = None
+            
+            if not isinstance(header, dict) or header.get("format") != TAGGER_FILE_FORMAT:
+                raise ValueError(f"{path} is not a tagger file")
+            
+            if header.get("version") != TAGGER_FILE_VERSION:
+                raise ValueError(f"{path} has an unsupported tagger file version {header.get('version')}")
+            
+            arrays = {}
+            for name, typecode, itemsize, length in header["arrays"]:
+                values = array(_typecode(typecode, itemsize))
+                values.frombytes(f.read(itemsize * length))
+                if len(values) != length:
+                    raise ValueError(f"{path} is truncated")
+                
+                if header["byteorder"] != sys.byteorder:
+                    values.byteswap()
+                
+                arrays[name] = values
+        
+        def columns(name: str) -> Tuple[array, ...]:
+            # The columns of a table are stored in order
+            return tuple(values for key, values in arrays.items() if key.startswith(name + "."))
+        
+        tag_names = header["tag_names"]
+        words = header["words"]
+        tagger = Tagger()
+        tagger.tags = {tag_names[tag] for tag in header["tags"]}
+        tagger._saved_counts = {
+            "tag_names": tag_names,
+            "words": words,
+            "word_counts": columns("word_counts"),
+            "bigram_counts": columns("bigram_counts"),
+            "trigram_counts": columns("trigram_counts"),
+        }
+        tagger._model = TaggerModel(
+            tag_names=tag_names,
+            tag_ids={tag: i for i, tag in enumerate(tag_names)},
+            tag_log_probs=arrays["tag_log_probs"],
+            context_rows=dict(header["context_rows"]),
+            word_ids={word: i for i, word in enumerate(words)},
+            word_offsets=arrays["word_offsets"],
+            word_tags=arrays["word_tags"],
+            word_log_probs=arrays["word_log_probs"],
+            fallback_log_probs=dict(header["fallback_log_probs"]),
+            free_tags=header["free_tags"],
+        )
+        return tagger
+    
+    def _get_word_log_probs(self, word: str) -> List[Tuple[int, float]]:
+        """
+        Returns the ids and the log-probabilities of the tags that the word has been seen with, sorted by id.
+        """
+        model = self.finalize()
+        word_id = model.word_ids.get(word)
+        log_probs = {}
+        if word_id is not None:
+            start, end = model.word_offsets[word_id], model.word_offsets[word_id + 1]
+            log_probs = dict(zip(model.word_tags[start:end], model.word_log_probs[start:end]))
+        
+        for tag, log_prob in model.fallback_log_probs.items():
+            if tag not in log_probs and word in XPOS_INDEX[model.tag_names[tag]]:
+                log_probs[tag] = log_prob
+        
+        return sorted(log_probs.items())
+
+    def _get_word_prob(self, word, tag):
+        model = self.finalize()
+        return dict(self._get_word_log_probs(word)).get(model.tag_ids.get(tag), UNSEEN_LOG_PROB)
 
     def _get_tag_prob(self, tag1, tag2, tag3):
-        p = self.tag_dist2[(tag2, tag3)][tag1]
-        t = sum(self.tag_dist2[(tag2, tag3)].values())
-        if t == 0:
-            p = self.tag_dist1[tag2][tag1]
-            t = sum(self.tag_dist1[tag2].values())
+        model = self.finalize()
+        n = len(model.tag_names) + 1
+        tag_ids = model.tag_ids
+        tag2 = tag_ids.get(tag2, n - 1)
+        row = model.context_rows.get(tag2 * n + tag_ids.get(tag3, n - 1), tag2)
+        return model.tag_log_probs[row * n + tag_ids.get(tag1, n - 1)]
+    
+    def tag(self, sent: List[Tuple[str, Optional[str]]], decoder: str = "viterbi", candidates: Optional[List[Optional[Collection[str]]]] = None) -> List[Tuple[str, Optional[str]]]:
+        """
+        Fills the missing tags of the sentence. The default decoder finds the most probable tags for the whole sentence with the
+        Viterbi algorithm, scoring every candidate tag of every word, and `decoder="greedy"` selects the tags one by one from
+        right to left.
+
+        `candidates` can give the possible tags of each untagged word, eg. the XPOS_GSUFF values of its analyses. Words without
+        candidates can have any tag that has no suffixes.
+        """
+        if decoder == "greedy":
+            return self.tag_greedy(sent, candidates)
+        
+        elif decoder != "viterbi":
+            raise ValueError(f"unknown decoder {decoder}")
+        
+        warmup()
+        model = self.finalize()
+        if not model.free_tags or all(p for _l, p in sent):
+            return sent.copy()
+        
+        n = len(model.tag_names) + 1
+        tag_log_probs = model.tag_log_probs
+        context_rows = model.context_rows
+        # The model predicts each tag from the two tags after it, so the sentence is decoded from right to left. The state
+        # after position i is the pair of tag ids at i and i+1, and the known tags are the only candidates at their positions.
+        end = model.tag_ids.get(END_TOKEN[1], n - 1)
+        states: Dict[Tuple[int, int], float] = {(end, end): 0.0}
+        backpointers: List[Dict[Tuple[int, int], Tuple[int, int]]] = []
+        # The names of the candidate tags at each position, as all tags unknown to the model have the same id
+        names: List[Dict[int, str]] = []
+        for i in reversed(range(len(sent))):
+            word, known_tag = sent[i]
+            if known_tag:
+                scored = {model.tag_ids.get(known_tag, n - 1): (0.0, known_tag)}
+            
+            else:
+                word_log_probs = dict(self._get_word_log_probs(word))
+                tag_names = candidates[i] if candidates and candidates[i] else [model.tag_names[tag] for tag in model.free_tags]
+                scored = {}
+                for name in tag_names:
+                    tag = model.tag_ids.get(name, n - 1)
+                    scored.setdefault(tag, (word_log_probs.get(tag, UNSEEN_LOG_PROB), name))
 
-        return -1000 if p == 0 else math.log(p / t)
+            
+            names.append({tag: name for tag, (_log_prob, name) in scored.items()})
+            word_candidates = [(tag, log_prob) for tag, (log_prob, _name) in scored.items()]
+            # The states are grouped by the tag at i+1, and each new state (tag1, tag2) continues the best of the states (tag2, tag3).
+            # States that predict tag1 with the same row of probabilities, eg. all unseen contexts of tag2, are continued only
+            # from the best of them.
+            contexts: Dict[int, Dict[int, Tuple[float, int]]] = {}
+            for (tag2, tag3), score in states.items():
+                rows = contexts.setdefault(tag2, {})
+                row = context_rows.get(tag2 * n + tag3, tag2) * n
+                if row not in rows or score > rows[row][0]:
+                    rows[row] = (score, tag3)
+            
+            new_states: Dict[Tuple[int, int], float] = {}
+            pointers: Dict[Tuple[int, int], Tuple[int, int]] = {}
+            for tag1, word_prob in word_candidates:
+                for tag2, rows in contexts.items():
+                    best_score = -math.inf
+                    best_tag3 = tag2
+                    for row, (score, tag3) in rows.items():
+                        score += tag_log_probs[row + tag1]
+                        if score > best_score:
+                            best_score = score
+                            best_tag3 = tag3
+                    
+                    new_states[(tag1, tag2)] = best_score + word_prob
+                    pointers[(tag1, tag2)] = (tag2, best_tag3)
+            
+            states = new_states
+            backpointers.append(pointers)
+        
+        state = max(states, key=states.__getitem__)
+        tags = []
+        for pointers, position_names in zip(reversed(backpointers), reversed(names)):
+            tags.append(position_names[state[0]])
+            state = pointers[state]
+        
+        return [(word, known_tag or tag) for (word, known_tag), tag in zip(sent, tags)]
     
-    def tag(self, sent: List[Tuple[str, Optional[str]]]) -> List[Tuple[str, Optional[str]]]:
+    def tag_greedy(self, sent: List[Tuple[str, Optional[str]]], candidates: Optional[List[Optional[Collection[str]]]] = None) -> List[Tuple[str, Optional[str]]]:
+        warmup()
+        model = self.finalize()
         sent = sent.copy()
         for i, ((l1, p1), (_l2, p2), (_l3, p3)) in reversed(list(enumerate(zip(sent, sent[1:] + [END_TOKEN], sent[2:] + [END_TOKEN, END_TOKEN])))):
             if not p1:
                 max_score = -1e9
                 max_tag: Optional[str] = None
-                for tag in self.tags:
-                    if "." in tag:
+                word_log_probs = dict(self._get_word_log_probs(l1))
+                for tag in candidates[i] if candidates and candidates[i] else self.tags:
+                    if "." in tag and not (candidates and candidates[i]):
                         continue
 
-                    score = self._get_word_prob(l1, tag) + self._get_tag_prob(tag, p2, p3)
+                    score = word_log_probs.get(model.tag_ids.get(tag, len(model.tag_names)), UNSEEN_LOG_PROB) + self._get_tag_prob(tag, p2, p3)
                     if score > max_score:
                         max_score = score
                         max_tag = tag
@@ -88,65 +490,96 @@ class Tagger:
         
         return sent
 
-def text_to_conllu(text: str, tagger: Optional[Tagger] = None) -> str:
+def _train_shard(path: str) -> Tagger:
+    with open(path, "r") as f:
+        return Tagger().partial_fit(iter_tagged_sentences(f))
+
+def train_tagger(paths: List[str], processes: Optional[int] = None) -> Tagger:
+    """
+    Trains a tagger with CoNLL-U files. Each file is counted in a separate process and the results are merged, which gives the
+    same tagger as training with the concatenated files.
+    """
+    import multiprocessing
+
+    tagger = Tagger()
+    with multiprocessing.Pool(processes) as pool:
+        for shard in pool.imap(_train_shard, paths):
+            tagger.merge(shard)
+    
+    return tagger
+
+def text_to_conllu(text: str, tagger: Optional[Tagger] = None, processes: Optional[int] = 1) -> str:
     """
     Converts a given text to the CONLL-U format with morphological information (dependencies are not parsed).
     If a word has multiple analyses, its POS and other info is not included (as they are not exactly known).
 
     If a tagger is provided, uses it to take the "best guess" when selecting from multiple analyses.
+
+    If `processes` is not 1, the text is converted in parts by that many processes (None uses all processors), see `text_to_conllu_chunks`.
+    """
+
+    if processes != 1:
+        return "".join(text_to_conllu_chunks(text, tagger, processes))
+
+    return Doc(text).to_conllu(tagger)
+
+# How many sentences are converted at a time by each process of `text_to_conllu_chunks`
+CHUNK_SENTENCES = 200
+
+_worker_tagger: Optional[Tagger] = None
+
+def _init_conllu_worker(tagger: Optional[Tagger]):
+    global _worker_tagger
+    warmup()
+    _worker_tagger = tagger
+
+def _conllu_chunk(text: str) -> str:
+    return Doc(text).to_conllu(_worker_tagger)
+
+def _split_sentences(text: str, chunk_sentences: int) -> Iterator[str]:
+    """
+    Splits the text to parts of `chunk_sentences` sentences. The parts end after the same punctuation as the sentences of `Doc`.
     """
+    char = 0
+    start = 0
+    sentences = 0
+    for token_type, token in tokenize(text):
+        char += len(token)
+        if token_type == "PUNCT" and token in ".!?":
+            sentences += 1
+            if sentences == chunk_sentences:
+                yield text[start:char]
+                start = char
+                sentences = 0
+    
+    if start < len(text):
+        yield text[start:]
+
+def text_to_conllu_chunks(text: str, tagger: Optional[Tagger] = None, processes: Optional[int] = None, chunk_sentences: int = CHUNK_SENTENCES) -> Iterator[str]:
+    """
+    Converts the text to the CONLL-U format in a process pool and yields the output in parts, in the order of the text.
+    The parts joined together are identical to the output of `text_to_conllu`, so they can be written to a file as they are yielded.
 
-    if not tagger:
-        return text_to_conllu_without_tagger(text)
-    
-    ans = ""
-
-    conllu = []
-    tagged_sent = []
-    tokens = tokenize(text)
-
-    def tag_and_append():
-        nonlocal ans, conllu, tagged_sent
-        guessed_tags = tagger.tag(tagged_sent)
-        for i, ((l1, p1), (_l2, p2)) in enumerate(zip(tagged_sent, guessed_tags)):
-            if not p1 and p2:
-                analyses = analyze(l1)
-                for analysis in analyses:
-                    if analysis["XPOS_GSUFF"] == p2:
-                        conllu[i] = "\t".join(_word_to_conllu(i+1, l1, [analysis]))
-                        break
-        
-        ans += "\n\n" + "\n".join(conllu)
-        conllu = []
-        tagged_sent = []
-
-    i = 1
-    for token_type, token in tokens:
-        if token_type == "SPACE":
-            continue
-
-        elif token_type == "PUNCT":
-            conllu.append("{}\t{}\t{}\tPUNCT\tPUNCT\t_\t_\t_\t_\t_".format(i, token, token))
-            tagged_sent.append((token, "PUNCT"))
-            if token in ".!?":
-                i = 1
-                tag_and_append()
+    The text is split at sentence boundaries, and each process loads the dictionary once.
+    """
+    import multiprocessing
+
+    first = True
+    with multiprocessing.Pool(processes, initializer=_init_conllu_worker, initargs=(tagger,)) as pool:
+        for conllu in pool.imap(_conllu_chunk, _split_sentences(text, chunk_sentences)):
+            if not conllu:
+                continue
             
-            else:
-                i += 1
-        
-        else:
-            analyses = analyze(token)
-            fields = _word_to_conllu(i, token, analyses)
-            conllu.append("\t".join(fields))
-            if fields[2] == "_":
-                tagged_sent.append((token, None))
+            # Without a tagger, the sentences are separated by line breaks that are not included at the ends of the parts
+            if not tagger and not first:
+                conllu = "\n" + conllu
             
-            else:
-                tagged_sent.append((fields[2], fields[4]))
-            i += 1
-    
-    if conllu:
-        tag_and_append()
-    
-    return ans
\ No newline at end of file
+            first = False
+            yield conllu
+
+def text_to_conllu_sentences(text: str, tagger: Optional[Tagger] = None) -> Iterator[ConlluSentence]:
+    """
+    Like `text_to_conllu`, but yields the sentences one at a time, eg. to be written with `yajwiz.conllu.write_conllu`.
+    """
+
+    return Doc(text).conllu_sentences(tagger)
@@ -0,0 +1,118 @@
+from typing import Any, Dict, List, Optional
+
+class RuleStats:
+    """
+    Statistics of one grammar rule.
+
+    `documents` counts the token lists the rule was run on and `skipped` those that the rule was not matched against, because
+    some token required by the rule did not occur in them. `encode_seconds` is the rule's share of encoding the tokens, which is
+    done once for all rules and divided between them by their number of conditions.
+    """
+
+    __slots__ = ("documents", "skipped", "matches", "errors", "encode_seconds", "match_seconds")
+
+    def __init__(self):
+        self.documents = 0
+        self.skipped = 0
+        self.matches = 0
+        self.errors = 0
+        self.encode_seconds = 0.0
+        self.match_seconds = 0.0
+
+    def merge(self, other: "RuleStats"):
+        for name in RuleStats.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in RuleStats.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+class Profile:
+    """
+    Statistics collected by the proofreader while profiling is enabled.
+    """
+
+    def __init__(self):
+        self.documents = 0
+        self.tokens = 0
+        self.analyzer_seconds = 0.0
+        self.encode_seconds = 0.0
+        self.rules: Dict[str, RuleStats] = {}
+
+    def rule(self, name: str) -> RuleStats:
+        if name not in self.rules:
+            self.rules[name] = RuleStats()
+
+        return self.rules[name]
+
+    def merge(self, other: "Profile"):
+        """
+        Adds the statistics of another profile, eg. one collected by another process, to this one.
+        """
+        self.documents += other.documents
+        self.tokens += other.tokens
+        self.analyzer_seconds += other.analyzer_seconds
+        self.encode_seconds += other.encode_seconds
+        for name, stats in other.rules.items():
+            self.rule(name).merge(stats)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Returns the statistics as a dict that can be serialized to JSON. The rules are sorted by the total time spent on them.
+        """
+        rules = sorted(self.rules.items(), key=lambda item: item[1].encode_seconds + item[1].match_seconds, reverse=True)
+        return {
+            "documents": self.documents,
+            "tokens": self.tokens,
+            "analyzer_seconds": self.analyzer_seconds,
+            "encode_seconds": self.encode_seconds,
+            "match_seconds": sum(stats.match_seconds for stats in self.rules.values()),
+            "rules": [dict(name=name, **stats.__getstate__()) for name, stats in rules],
+        }
+
+    def format(self, limit: Optional[int] = None) -> str:
+        """
+        Returns the statistics as a human-readable table of the `limit` slowest rules.
+        """
+        report = self.report()
+        lines = [
+            f"{report['documents']} documents, {report['tokens']} tokens",
+            f"analyzer {report['analyzer_seconds']:.4f} s, encoding {report['encode_seconds']:.4f} s, matching {report['match_seconds']:.4f} s",
+            "",
+        ]
+        rows: List[tuple] = [("rule", "documents", "skipped", "matches", "errors", "encode s", "match s")]
+        for stats in report["rules"][:limit]:
+            rows.append((stats["name"], stats["documents"], stats["skipped"], stats["matches"], stats["errors"], f"{stats['encode_seconds']:.4f}", f"{stats['match_seconds']:.4f}"))
+
+        widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+        lines += ["  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+        return "\n".join(lines)
+
+# The profile being collected, or None when profiling is disabled
+PROFILE: Optional[Profile] = None
+
+def enable_profiling() -> Profile:
+    """
+    Starts collecting statistics of the proofreader in a new profile and returns it.
+    """
+    global PROFILE
+    PROFILE = Profile()
+    return PROFILE
+
+def disable_profiling() -> Optional[Profile]:
+    """
+    Stops collecting statistics and returns the collected profile.
+    """
+    global PROFILE
+    profile = PROFILE
+    PROFILE = None
+    return profile
+
+def profiling_report() -> Optional[Dict[str, Any]]:
+    """
+    Returns the report of the current profile, or None if profiling is disabled.
+    """
+    return PROFILE.report() if PROFILE else None
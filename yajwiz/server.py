@@ -0,0 +1,254 @@
+import inspect
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from .types import ProofreaderError
+
+# A grammar checking server that keeps the analyzer warm between requests. It speaks JSON-RPC 2.0 with one message per
+# line, either over stdin/stdout or over a Unix socket.
+#
+# Methods:
+# - check: {"text": str, "rules": [pack, ...], "overlapping": bool, "line_range": [start, end]}
+#   Returns the errors as a list of objects with the fields of ProofreaderError. Only `text` is required. `rules` lists rule
+#   packs to use instead of the built-in rules ("builtin" selects the built-in rules). If `line_range` is given, only the
+#   lines start..end-1 (zero-based) of the text are checked, and the locations are still relative to the whole text.
+# - ping: returns "pong".
+# - shutdown: stops the server.
+
+logger = logging.getLogger(__name__)
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+class RequestError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+_rule_packs: Dict[Tuple[str, int], list] = {}
+
+def _rules(packs: Optional[List[str]]) -> list:
+    from .grammar_rules import GRAMMAR_RULES, load_rule_pack
+
+    if packs is None:
+        return GRAMMAR_RULES
+
+    rules = []
+    for pack in packs:
+        if pack == "builtin":
+            rules += GRAMMAR_RULES
+            continue
+
+        try:
+            key = (pack, os.stat(pack).st_mtime_ns)
+
+        except OSError as e:
+            raise RequestError(INVALID_PARAMS, f"cannot read rule pack {pack}: {e}")
+
+        if key not in _rule_packs:
+            _rule_packs[key] = load_rule_pack(pack)
+
+        rules += _rule_packs[key]
+
+    return rules
+
+def _check(text: str, rules: Optional[List[str]] = None, overlapping: bool = False, line_range: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    from .analyzer import get_errors
+
+    offset = 0
+    if line_range is not None:
+        if not isinstance(line_range, list) or len(line_range) != 2 or not all(type(i) is int for i in line_range):
+            raise RequestError(INVALID_PARAMS, "line_range must be a list of two integers")
+
+        start, end = line_range
+        lines = text.splitlines(keepends=True)
+        offset = sum(len(line) for line in lines[:start])
+        text = "".join(lines[start:end])
+
+    errors = get_errors(text, overlapping=overlapping, rules=_rules(rules))
+    return [error._replace(location=error.location + offset, end_location=error.end_location + offset)._asdict() for error in errors]
+
+METHODS = {
+    "check": _check,
+    "ping": lambda: "pong",
+    "shutdown": lambda: None,
+}
+
+def handle_request(request: Any) -> Optional[dict]:
+    """
+    Handles one JSON-RPC request and returns the response, or None if the request is a notification.
+    """
+    request_id = request.get("id") if isinstance(request, dict) else None
+    try:
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            raise RequestError(INVALID_REQUEST, "invalid request")
+
+        if request["method"] not in METHODS:
+            raise RequestError(METHOD_NOT_FOUND, f"unknown method {request['method']}")
+
+        params = request.get("params", {})
+        if not isinstance(params, dict):
+            raise RequestError(INVALID_PARAMS, "params must be an object")
+
+        method = METHODS[request["method"]]
+        try:
+            inspect.signature(method).bind(**params)
+
+        except TypeError as e:
+            raise RequestError(INVALID_PARAMS, str(e))
+
+        result = method(**params)
+
+        response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    except RequestError as e:
+        response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": str(e)}}
+
+    except:
+        logger.error("Error while handling a request!", exc_info=sys.exc_info())
+        response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": INTERNAL_ERROR, "message": repr(sys.exc_info()[1])}}
+
+    if isinstance(request, dict) and "id" not in request:
+        return None
+
+    return response
+
+# Connections are served by their own threads, but the requests are handled one at a time
+_request_lock = threading.Lock()
+
+def _handle_line(line: str) -> Tuple[Optional[dict], bool]:
+    try:
+        request = json.loads(line)
+
+    except json.JSONDecodeError as e:
+        return {"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": str(e)}}, False
+
+    shutdown = isinstance(request, dict) and request.get("method") == "shutdown"
+    with _request_lock:
+        return handle_request(request), shutdown
+
+def serve_stdio(input: TextIO = sys.stdin, output: TextIO = sys.stdout):
+    """
+    Serves requests from `input` until it is closed or a shutdown request is received.
+    """
+    from .analyzer import warmup
+
+    warmup()
+    for line in input:
+        if not line.strip():
+            continue
+
+        response, shutdown = _handle_line(line)
+        if response is not None:
+            output.write(json.dumps(response, ensure_ascii=False) + "\n")
+            output.flush()
+
+        if shutdown:
+            break
+
+class _SocketHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            response, shutdown = _handle_line(line.decode("utf-8"))
+            if response is not None:
+                self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+            if shutdown:
+                threading.Thread(target=self.server.shutdown).start()
+                break
+
+class _SocketServer(socketserver.ThreadingUnixStreamServer):
+    # Clients that keep their connections open do not keep the server running after a shutdown request
+    daemon_threads = True
+    block_on_close = False
+
+def serve_socket(path: str):
+    """
+    Serves requests on a Unix socket until a shutdown request is received. Each connection is served by its own thread, so
+    a client that keeps its connection open does not block the others.
+    """
+    from .analyzer import warmup
+
+    warmup()
+    if os.path.exists(path):
+        os.unlink(path)
+
+    with _SocketServer(path, _SocketHandler) as server:
+        try:
+            server.serve_forever()
+
+        finally:
+            os.unlink(path)
+
+class Client:
+    """
+    A client for a server started with `serve_socket`.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(path)
+        self.file = self.socket.makefile("rwb")
+        self.next_id = 0
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, method: str, **params) -> int:
+        """
+        Sends a request without waiting for the response and returns its id. Responses arrive in the order of the requests.
+        """
+        self.next_id += 1
+        request = {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}
+        self.file.write((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        return self.next_id
+
+    def receive(self) -> Any:
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("the server closed the connection")
+
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"]["message"])
+
+        return response["result"]
+
+    def request(self, method: str, **params) -> Any:
+        self.send(method, **params)
+        return self.receive()
+
+    def check(self, text: str, **params) -> List[ProofreaderError]:
+        return [ProofreaderError(**error) for error in self.request("check", text=text, **params)]
+
+def connect(path: str) -> Optional[Client]:
+    """
+    Returns a client connected to the server at `path`, or None if no server is running there.
+    """
+    try:
+        return Client(path)
+
+    except (OSError, AttributeError):
+        return None
@@ -0,0 +1,182 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .analyzer import _tokenize_for_proofreader
+from .grammar_rules import GRAMMAR_RULES, GrammarRule, _condition_matches, _token_masks, proofread_tokens
+from .types import ProofreaderError, Token
+
+SENTENCE_END_REGEX = re.compile(r"[.!?]+\s+")
+
+# The punctuation tokens that can end a sentence. Longer runs like "..." have the same bits as ".."
+SENTENCE_END_PUNCTUATION = [".", "!", "?", ".."]
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Splits the text to sentences after periods, exclamation marks and question marks that are followed by whitespace. Each
+    sentence includes its trailing whitespace, so the sentences joined together are the original text.
+    """
+    sentences = []
+    start = 0
+    for m in SENTENCE_END_REGEX.finditer(text):
+        sentences.append(text[start:m.end()])
+        start = m.end()
+
+    if start < len(text):
+        sentences.append(text[start:])
+
+    return sentences
+
+def sentence_reach(rules: List[GrammarRule] = GRAMMAR_RULES) -> int:
+    """
+    Returns the number of sentence boundaries that a match of the rules can cross. A match crosses a boundary only if it
+    contains the punctuation that ends a sentence, so this is the largest number of such punctuation tokens in a match.
+
+    Raises ValueError if a rule can match across any number of sentences.
+    """
+    end_masks = _token_masks([Token(0, "PUNCT", text, []) for text in SENTENCE_END_PUNCTUATION])
+    reach = 0
+    for rule in rules:
+        pattern = rule.token_pattern
+        conditions = sum(1 << i for i, condition in enumerate(pattern.conditions) if any(_condition_matches(masks, condition) for masks in end_masks))
+        count = pattern.max_tokens(conditions)
+        if count is None:
+            raise ValueError(f"rule {rule.name!r} can match across any number of sentences")
+
+        reach = max(reach, count)
+
+    return reach
+
+class DocumentSession:
+    """
+    Checks a document that is edited over time.
+
+    The text is split to sentences, and the tokens and the errors of each sentence are cached by its content. A sentence is checked
+    together with `context` sentences on both sides, so that rules can match across sentence boundaries. By default `context` is
+    the reach of the rules given by `sentence_reach`. After an edit, only the sentences whose window changed are checked again.
+    """
+
+    def __init__(self, text: str = "", rules: List[GrammarRule] = GRAMMAR_RULES, context: Optional[int] = None, overlapping=False):
+        self.rules = rules
+        self.context = sentence_reach(rules) if context is None else context
+        self.overlapping = overlapping
+        self.sentences: List[str] = []
+        self.checked_sentences = 0
+        self._tokens: Dict[str, List[Token]] = {}
+        self._errors: Dict[Tuple[Tuple[str, ...], int, bool, bool], List[ProofreaderError]] = {}
+        self._current_errors: List[ProofreaderError] = []
+        self.update(text)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.sentences)
+
+    @property
+    def errors(self) -> List[ProofreaderError]:
+        """
+        The errors of the current text, sorted by location.
+        """
+        return self._current_errors
+
+    def edit(self, start: int, end: int, replacement: str) -> List[ProofreaderError]:
+        """
+        Replaces the characters `start..end-1` with `replacement` and returns the errors of the new text.
+        """
+        text = self.text
+        return self.update(text[:start] + replacement + text[end:])
+
+    def update(self, text: str) -> List[ProofreaderError]:
+        """
+        Replaces the text of the document and returns its errors. The locations of the errors are relative to the new text.
+        """
+        self.sentences = split_sentences(text)
+        self.checked_sentences = 0
+        tokens = {sentence: self._tokens[sentence] if sentence in self._tokens else _tokenize_for_proofreader(sentence) for sentence in self.sentences}
+        errors = {}
+        current_errors = []
+        offset = 0
+        for i, sentence in enumerate(self.sentences):
+            window_start = max(0, i - self.context)
+            window_end = i + self.context + 1
+            window = tuple(self.sentences[window_start:window_end])
+            # Windows at the ends of the text are checked differently, because `^` and `$` can match there
+            key = (window, i - window_start, window_start == 0, window_end >= len(self.sentences))
+            if key in self._errors:
+                sentence_errors = self._errors[key]
+
+            else:
+                sentence_errors = self._check(*key, tokens)
+                self.checked_sentences += 1
+
+            errors[key] = sentence_errors
+            current_errors += [error._replace(location=error.location + offset, end_location=error.end_location + offset) for error in sentence_errors]
+            offset += len(sentence)
+
+        # Only the current sentences are kept, so the caches do not grow while the document is edited
+        self._tokens = tokens
+        self._errors = errors
+        self._current_errors = sorted(current_errors, key=lambda error: (error.location, error.end_location))
+        return self._current_errors
+
+    def _check(self, window: Tuple[str, ...], index: int, at_start: bool, at_end: bool, tokens: Dict[str, List[Token]]) -> List[ProofreaderError]:
+        """
+        Checks the window and returns the errors that start in its `index`th sentence, relative to the start of that sentence.
+        `at_start` and `at_end` tell whether the window begins and ends the text.
+        """
+        window_tokens = []
+        offset = 0
+        sentence_start = sentence_end = 0
+        for i, sentence in enumerate(window):
+            if i == index:
+                sentence_start, sentence_end = offset, offset + len(sentence)
+
+            window_tokens += [token._replace(location=token.location + offset) for token in tokens[sentence]]
+            offset += len(sentence)
+
+        errors = proofread_tokens(window_tokens, self.rules, overlapping=self.overlapping, at_start=at_start, at_end=at_end)
+        return [
+            error._replace(location=error.location - sentence_start, end_location=error.end_location - sentence_start)
+            for error in errors
+            if sentence_start <= error.location < sentence_end
+        ]
+
+def test_session(rules: List[GrammarRule] = GRAMMAR_RULES, documents: int = 100, edits: int = 20, seed: int = 0):
+    """
+    Checks that the errors of a session are the same as those of checking the whole text again after each of a series of
+    random edits. The texts are built from the examples of the rules.
+    """
+    import random
+    from .analyzer import get_errors
+
+    rng = random.Random(seed)
+    examples = [example for rule in rules for example in rule.positive_examples + rule.negative_examples]
+    separators = [" ", ". ", ".\n", "! ", "? ", "... ", "\n", ", "]
+    def random_text() -> str:
+        return "".join(rng.choice(examples) + rng.choice(separators) for _ in range(rng.randint(1, 8)))
+
+    def key(error: ProofreaderError):
+        return (error.location, error.end_location, error.rule_name, error.message)
+
+    succ = 0
+    fail = 0
+    for _ in range(documents):
+        session = DocumentSession(random_text(), rules)
+        for _ in range(edits):
+            text = session.text
+            start = rng.randint(0, len(text))
+            end = rng.randint(start, min(len(text), start + 40))
+            errors = session.edit(start, end, rng.choice(["", rng.choice(separators), random_text()]))
+            expected = get_errors(session.text, rules=rules)
+            if sorted(errors, key=key) == sorted(expected, key=key):
+                succ += 1
+
+            else:
+                print(repr(session.text))
+                print("session:", errors)
+                print("expected:", expected)
+                print()
+                fail += 1
+
+    print(f"Result: {succ} ok, {fail} failed")
+
+if __name__ == "__main__":
+    test_session()
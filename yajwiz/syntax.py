@@ -0,0 +1,201 @@
+from typing import Iterable, Iterator, Optional, Set, get_args
+
+from . import bits
+from .tables import LOCATIVE_NOUNS, PREFIX_TABLE, SUFFIX_TYPES, Person, Number
+from .types import Analysis, SyntaxInfo, Xpos
+
+def syntax_info(analysis: Analysis) -> SyntaxInfo:
+    """
+    Returns the role of the word in the syntax and the person and number of its arguments. The BITS are not included.
+    """
+    info: SyntaxInfo = {}
+    if analysis["POS"] == "N":
+        info["ROLE"] = "NP"
+
+    elif analysis["POS"] == "V" and analysis.get("SUFFIX", {}).get("V9", None) in {"-wI'", "-ghach"}:
+        info["ROLE"] = "NP"
+
+    elif analysis["POS"] == "V":
+        info["ROLE"] = "VP"
+
+    else:
+        info["ROLE"] = "OTHER"
+
+    if info["ROLE"] == "VP":
+        voice = "NP" if "-lu':v" in analysis["PARTS"] else "P"
+        subj_person: Set[Person]
+        subj_number: Optional[Number]
+        obj_person: Set[Person]
+        obj_number: Optional[Number]
+        if "PREFIX" in analysis or voice == "NP":
+            if (analysis.get("PREFIX", "-"), voice) not in PREFIX_TABLE: # ungrammatical word
+                subj_person = set()
+                subj_number = None
+                obj_person = set()
+                obj_number = None
+
+            else:
+                subj_person, subj_number, obj_person, obj_number = PREFIX_TABLE[(analysis.get("PREFIX", "-"), voice)]
+
+        elif analysis["XPOS"] in {"VS", "VI"} and "-moH:v" not in analysis["PARTS"]:
+            subj_person = {3}
+            subj_number = None
+            obj_person = {0}
+            obj_number = None
+
+        else:
+            subj_person = {3}
+            subj_number = None
+            obj_person = {0, 3}
+            obj_number = None
+
+        info["SUBJECT_PERSON"] = subj_person
+        info["SUBJECT_NUMBER"] = subj_number
+        info["OBJECT_PERSON"] = obj_person
+        info["OBJECT_NUMBER"] = obj_number
+
+    elif info["ROLE"] == "NP":
+        if "inhps" in analysis["BOQWIZ_POS"] or "inhpl" in analysis["BOQWIZ_POS"]:
+            info["PLURAL"] = False
+
+        if analysis.get("SUFFIX", {}).get("N2", None) in {"-pu'", "-Du'", "-mey"}:
+            info["PLURAL"] = True
+
+    return info
+
+# The bits are computed in families, so that the families that no grammar rule refers to can be skipped
+
+BASE_BITS = set(get_args(Xpos)) | {"N", "V", "NP", "VP", "OTHER"}
+
+SUFFIX_SLOTS = set(SUFFIX_TYPES.values())
+
+NAMED_BITS = {
+    "Subordinate": "subordinate",
+    "Singular": "number",
+    "Plural": "number",
+    "PossessiveSuffix": "possessive",
+    "LocativeNoun": "locative",
+}
+
+ALL_FAMILIES = {"word", "persons", "tu'lu'", "subordinate", "number", "possessive", "locative", "parts", "suffixes", "prefix"}
+
+def _needed_families(names: Iterable[str]) -> Set[str]:
+    """
+    Returns the families of bits that can contain the given bits. A bit that is not known to belong to a certain family can
+    be the name of a part, a suffix or a prefix.
+    """
+    families = set()
+    for name in names:
+        if name.startswith("«"):
+            families.add("word")
+
+        elif name.startswith(("Subj", "Obj")):
+            families.add("persons")
+            if name in {"ObjPlur", "Obj3Plur"}:
+                families.add("tu'lu'")
+
+        elif name in NAMED_BITS:
+            families.add(NAMED_BITS[name])
+
+        elif name in SUFFIX_SLOTS:
+            families.add("suffixes")
+
+        elif name not in BASE_BITS:
+            if name == "tu'lu':v":
+                families.add("tu'lu'")
+
+            families |= {"parts", "suffixes", "prefix"}
+
+    return families
+
+def _iter_bits(analysis: Analysis, info: SyntaxInfo, families: Set[str]) -> Iterator[str]:
+    yield analysis["XPOS"]
+    yield analysis["POS"]
+    if "word" in families:
+        yield f"«{analysis['WORD']}»"
+
+    yield info["ROLE"]
+    if info["ROLE"] == "VP":
+        if "persons" in families:
+            subj_number = info["SUBJECT_NUMBER"]
+            for person in info["SUBJECT_PERSON"]:
+                yield f"Subj{person}{subj_number or ''}"
+                yield f"Subj{person}"
+                if subj_number:
+                    yield f"Subj{subj_number}"
+
+            obj_number = info["OBJECT_NUMBER"]
+            for person in info["OBJECT_PERSON"]:
+                yield f"Obj{person}{obj_number or ''}"
+                yield f"Obj{person}"
+                if obj_number:
+                    yield f"Obj{obj_number}"
+
+        if "tu'lu'" in families and "tu':v" in analysis["PARTS"] and "-lu':v" in analysis["PARTS"]:
+            yield "tu'lu':v"
+            if analysis.get("PREFIX", "-") == "-":
+                yield "ObjPlur"
+                yield "Obj3Plur"
+
+        if "subordinate" in families and set(analysis["PARTS"]).intersection({"-meH:v", "-DI':v", "-chugh:v", "-vIS:v", "-pa':v", "-mo':v"}):
+            yield "Subordinate"
+
+    elif info["ROLE"] == "NP":
+        if "number" in families:
+            if "inhps" in analysis["BOQWIZ_POS"] or "inhpl" in analysis["BOQWIZ_POS"]:
+                yield "Singular"
+
+            if analysis.get("SUFFIX", {}).get("N2", None) in {"-pu'", "-Du'", "-mey"}:
+                yield "Plural"
+
+        if "possessive" in families:
+            n4 = analysis.get("SUFFIX", {}).get("N4", None)
+            if n4 and n4 not in {"-vam", "-vetlh"}:
+                yield "PossessiveSuffix"
+
+    if "parts" in families:
+        for part in analysis["PARTS"]:
+            yield part
+            if ":" in part:
+                yield part[:part.index(":")]
+
+            if part in LOCATIVE_NOUNS:
+                yield "LocativeNoun"
+
+    elif "locative" in families:
+        for part in analysis["PARTS"]:
+            if part in LOCATIVE_NOUNS:
+                yield "LocativeNoun"
+
+    if "suffixes" in families:
+        for key, val in analysis.get("SUFFIX", {}).items():
+            yield key
+            yield val
+
+    if "prefix" in families:
+        if prefix := analysis.get("PREFIX", None):
+            yield prefix
+
+def syntax_bits(analysis: Analysis, info: SyntaxInfo) -> Set[str]:
+    """
+    Returns all bits that grammar rules can use to refer to the analysis.
+    """
+    return set(_iter_bits(analysis, info, ALL_FAMILIES))
+
+_families_generation = -1
+_families: Set[str] = ALL_FAMILIES
+
+def syntax_mask(analysis: Analysis) -> int:
+    """
+    Returns the bits of the analysis as a mask (see `yajwiz.bits`). Only the families of bits that contain registered bits
+    are computed.
+    """
+    global _families_generation, _families
+    if _families_generation != bits.generation():
+        _families = _needed_families(bits.BIT_NAMES)
+        _families_generation = bits.generation()
+
+    if "SYNTAX_INFO" in analysis and "BITS" in analysis["SYNTAX_INFO"]:
+        return bits.bits_to_mask(analysis["SYNTAX_INFO"]["BITS"])
+
+    return bits.bits_to_mask(_iter_bits(analysis, syntax_info(analysis), _families))
@@ -0,0 +1,504 @@
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .bits import register_bit
+
+# A matching engine for grammar rule patterns. A pattern such as `{VP,!-bogh,!VS} error({«joq»}|{«ghap»})` is parsed to
+# a syntax tree and compiled to a small program that is run by a Pike VM over the tokens of a document. Each token is
+# given as a mask of the conditions it satisfies, so a token step is a single integer operation. Threads are kept in
+# priority order, so the matches and the groups are the same as a backtracking regex engine would find.
+
+Condition = Tuple[int, int]
+
+# Syntax tree
+
+class Test(NamedTuple):
+    """
+    Matches one token. The condition is an index to the conditions of the pattern, or None if any token matches.
+    """
+    condition: Optional[int]
+
+class Anchor(NamedTuple):
+    kind: str
+
+class Group(NamedTuple):
+    name: Optional[str]
+    body: "Alternation"
+
+class Repeat(NamedTuple):
+    item: "Node"
+    kind: str
+
+class Sequence_(NamedTuple):
+    items: List["Node"]
+
+class Alternation(NamedTuple):
+    branches: List[Sequence_]
+
+Node = Union[Test, Anchor, Group, Repeat, Sequence_, Alternation]
+
+def compile_condition(bitcond: Dict[str, str]) -> Condition:
+    """
+    Compiles a condition like `{VP,!-bogh}` to a pair of masks: the bits that all analyses of a token must have and the bits
+    that no analysis may have.
+    """
+    ones = 0
+    zeros = 0
+    for bit, val in bitcond.items():
+        if val == "1":
+            ones |= register_bit(bit)
+
+        else:
+            zeros |= register_bit(bit)
+
+    return ones, zeros
+
+def _tokenize(pattern: str) -> List[tuple]:
+    parts = []
+    while pattern:
+        group_name = None
+        if m := re.match(r"\w+", pattern):
+            group_name = m.group(0)
+            pattern = pattern[len(group_name):]
+
+        if pattern[0] == "{":
+            pattern = pattern[1:]
+            end_index = pattern.index("}")
+            bitcond = {}
+            for bit in pattern[:end_index].split(","):
+                val = "1"
+                if bit.startswith("!"):
+                    val = "0"
+                    bit = bit[1:]
+
+                bitcond[bit] = val
+
+            parts.append(("test", group_name, bitcond))
+            pattern = pattern[end_index+1:]
+
+        elif pattern[0] == "(":
+            parts.append(("(", group_name))
+            pattern = pattern[1:]
+
+        elif not group_name and pattern[0] in "*+?|)^$":
+            parts.append((pattern[0],))
+            pattern = pattern[1:]
+
+        elif pattern[0] == "." or group_name and pattern[0].isspace():
+            parts.append(("test", group_name, {}))
+            pattern = pattern[1:]
+
+        elif pattern[0].isspace():
+            pattern = pattern[1:]
+
+        else:
+            raise Exception("Invalid pattern")
+
+    return parts
+
+class _Parser:
+    def __init__(self, parts: List[tuple]):
+        self.parts = parts
+        self.i = 0
+        self.conditions: List[Condition] = []
+        self.condition_names: List[Dict[str, str]] = []
+        self.bits: List[str] = []
+
+    def peek(self) -> Optional[str]:
+        return self.parts[self.i][0] if self.i < len(self.parts) else None
+
+    def alternation(self) -> Alternation:
+        branches = [self.sequence()]
+        while self.peek() == "|":
+            self.i += 1
+            branches.append(self.sequence())
+
+        return Alternation(branches)
+
+    def sequence(self) -> Sequence_:
+        items = []
+        while self.peek() not in {None, "|", ")"}:
+            part = self.parts[self.i]
+            self.i += 1
+            if part[0] == "test":
+                _, name, bitcond = part
+                item = Test(self.condition(bitcond) if bitcond else None)
+                if name:
+                    item = Group(name, Alternation([Sequence_([item])]))
+
+            elif part[0] == "(":
+                item = Group(part[1], self.alternation())
+                if self.peek() != ")":
+                    raise Exception("Invalid pattern")
+
+                self.i += 1
+
+            elif part[0] in {"^", "$"}:
+                item = Anchor(part[0])
+
+            else:
+                raise Exception("Invalid pattern")
+
+            if self.peek() in {"*", "+", "?"}:
+                item = Repeat(item, self.peek())
+                self.i += 1
+
+            items.append(item)
+
+        return Sequence_(items)
+
+    def condition(self, bitcond: Dict[str, str]) -> int:
+        for bit in bitcond:
+            if bit not in self.bits:
+                self.bits.append(bit)
+
+        condition = compile_condition(bitcond)
+        if condition not in self.conditions:
+            self.conditions.append(condition)
+            self.condition_names.append(bitcond)
+
+        return self.conditions.index(condition)
+
+def _required(node: Node) -> List[int]:
+    """
+    Returns the clauses that every match of the node satisfies. Each clause is a mask of condition indices, at least one of
+    which must hold for some token.
+    """
+    if isinstance(node, Test):
+        return [] if node.condition is None else [1 << node.condition]
+
+    elif isinstance(node, Anchor):
+        return []
+
+    elif isinstance(node, Group):
+        return _required(node.body)
+
+    elif isinstance(node, Repeat):
+        return _required(node.item) if node.kind == "+" else []
+
+    elif isinstance(node, Sequence_):
+        return [clause for item in node.items for clause in _required(item)]
+
+    clauses = _required(node.branches[0])
+    for branch in node.branches[1:]:
+        branch_clauses = _required(branch)
+        clauses = [a | b for a in clauses for b in branch_clauses]
+
+    return clauses
+
+def _first(node: Node) -> Tuple[Optional[int], bool]:
+    """
+    Returns a mask of the conditions that the first token of a match may satisfy (None if any token can start a match) and
+    whether the node can match the empty sequence.
+    """
+    if isinstance(node, Test):
+        return (None if node.condition is None else 1 << node.condition), False
+
+    elif isinstance(node, Anchor):
+        return 0, True
+
+    elif isinstance(node, Group):
+        return _first(node.body)
+
+    elif isinstance(node, Repeat):
+        first, nullable = _first(node.item)
+        return first, nullable or node.kind != "+"
+
+    elif isinstance(node, Sequence_):
+        mask = 0
+        for item in node.items:
+            first, nullable = _first(item)
+            if first is None:
+                return None, False
+
+            mask |= first
+            if not nullable:
+                return mask, False
+
+        return mask, True
+
+    mask = 0
+    nullable = False
+    for branch in node.branches:
+        first, branch_nullable = _first(branch)
+        if first is None:
+            return None, False
+
+        mask |= first
+        nullable = nullable or branch_nullable
+
+    return mask, nullable
+
+def _max_tokens(node: Node, conditions: int) -> Optional[int]:
+    """
+    Returns the largest number of tokens that a match of the node can contain and that may satisfy one of the conditions in
+    the mask `conditions`, or None if there is no limit. Tests that match any token are always counted.
+    """
+    if isinstance(node, Test):
+        return int(node.condition is None or bool(conditions >> node.condition & 1))
+
+    elif isinstance(node, Anchor):
+        return 0
+
+    elif isinstance(node, Group):
+        return _max_tokens(node.body, conditions)
+
+    elif isinstance(node, Repeat):
+        count = _max_tokens(node.item, conditions)
+        return None if count and node.kind != "?" else count
+
+    counts = [_max_tokens(item, conditions) for item in (node.items if isinstance(node, Sequence_) else node.branches)]
+    if None in counts:
+        return None
+
+    return sum(counts) if isinstance(node, Sequence_) else max(counts)
+
+# Program
+
+TEST, SPLIT, JMP, SAVE, BOL, EOL, MATCH = range(7)
+
+class _Compiler:
+    def __init__(self):
+        self.program: List[list] = []
+        self.groups: Dict[str, int] = {}
+
+    def emit(self, *instruction) -> int:
+        self.program.append(list(instruction))
+        return len(self.program) - 1
+
+    def compile(self, node: Node):
+        if isinstance(node, Test):
+            self.emit(TEST, node.condition)
+
+        elif isinstance(node, Anchor):
+            self.emit(BOL if node.kind == "^" else EOL)
+
+        elif isinstance(node, Group):
+            if node.name:
+                if node.name not in self.groups:
+                    self.groups[node.name] = len(self.groups) + 1
+
+                slot = 2 * self.groups[node.name]
+                self.emit(SAVE, slot)
+                self.compile(node.body)
+                self.emit(SAVE, slot + 1)
+
+            else:
+                self.compile(node.body)
+
+        elif isinstance(node, Repeat):
+            if node.kind == "*":
+                split = self.emit(SPLIT, None, None)
+                self.compile(node.item)
+                self.emit(JMP, split)
+                self.program[split][1:] = [split + 1, len(self.program)]
+
+            elif node.kind == "+":
+                start = len(self.program)
+                self.compile(node.item)
+                self.emit(SPLIT, start, len(self.program) + 1)
+
+            else:
+                split = self.emit(SPLIT, None, None)
+                self.compile(node.item)
+                self.program[split][1:] = [split + 1, len(self.program)]
+
+        elif isinstance(node, Sequence_):
+            for item in node.items:
+                self.compile(item)
+
+        else:
+            jumps = []
+            for branch in node.branches[:-1]:
+                split = self.emit(SPLIT, None, None)
+                self.compile(branch)
+                jumps.append(self.emit(JMP, None))
+                self.program[split][1:] = [split + 1, len(self.program)]
+
+            self.compile(node.branches[-1])
+            for jump in jumps:
+                self.program[jump][1] = len(self.program)
+
+class PatternMatch(NamedTuple):
+    """
+    A match of a token pattern. The spans are pairs of token indices (start inclusive, end exclusive).
+    """
+    span: Tuple[int, int]
+    groups: Dict[str, Tuple[int, int]]
+
+class TokenPattern:
+    """
+    A compiled grammar rule pattern.
+    """
+
+    def __init__(self, pattern: str):
+        parser = _Parser(_tokenize(pattern))
+        tree = parser.alternation()
+        if parser.i != len(parser.parts):
+            raise Exception("Invalid pattern")
+
+        self.pattern = pattern
+        self.conditions: List[Condition] = parser.conditions
+        self.condition_names = parser.condition_names
+        self.included_bits: List[str] = parser.bits
+        self.required_conditions: List[int] = _required(tree)
+        self.first_conditions, _ = _first(tree)
+
+        compiler = _Compiler()
+        compiler.emit(SAVE, 0)
+        compiler.compile(tree)
+        compiler.emit(SAVE, 1)
+        compiler.emit(MATCH)
+        self.program = [tuple(instruction) for instruction in compiler.program]
+        self.groups = compiler.groups
+        self.slot_count = 2 * (len(self.groups) + 1)
+        self._closures: Dict[Tuple[int, bool, bool], List[Tuple[int, Tuple[int, ...]]]] = {}
+
+    def __repr__(self) -> str:
+        return f"TokenPattern({self.pattern!r})"
+
+    # The bit positions are assigned at runtime, so pickled patterns store the bit names of the conditions and
+    # the masks are recompiled when the pattern is loaded
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        del state["conditions"]
+        state["_closures"] = {}
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.conditions = [compile_condition(bitcond) for bitcond in self.condition_names]
+
+    def max_tokens(self, conditions: int) -> Optional[int]:
+        """
+        Returns the largest number of tokens in a match that may satisfy one of the conditions in the mask `conditions`, or
+        None if a match can contain any number of them.
+        """
+        return _max_tokens(_Parser(_tokenize(self.pattern)).alternation(), conditions)
+
+    def _closure(self, pc: int, at_start: bool, at_end: bool) -> List[Tuple[int, Tuple[int, ...]]]:
+        """
+        Returns the instructions that consume a token or accept, in priority order, that are reachable from `pc` without
+        consuming tokens, together with the capture slots saved on the way.
+        """
+        key = (pc, at_start, at_end)
+        if key in self._closures:
+            return self._closures[key]
+
+        closure: List[Tuple[int, Tuple[int, ...]]] = []
+        visited = set()
+        def visit(pc: int, saves: Tuple[int, ...]):
+            if pc in visited:
+                return
+
+            visited.add(pc)
+            instruction = self.program[pc]
+            op = instruction[0]
+            if op == JMP:
+                visit(instruction[1], saves)
+
+            elif op == SPLIT:
+                visit(instruction[1], saves)
+                visit(instruction[2], saves)
+
+            elif op == SAVE:
+                visit(pc + 1, saves + (instruction[1],))
+
+            elif op == BOL:
+                if at_start:
+                    visit(pc + 1, saves)
+
+            elif op == EOL:
+                if at_end:
+                    visit(pc + 1, saves)
+
+            else:
+                closure.append((pc, saves))
+
+        visit(pc, ())
+        self._closures[key] = closure
+        return closure
+
+    def _add_threads(self, threads: list, visited: List[int], pc: int, captures: tuple, pos: int, start: int, end: int):
+        for target, saves in self._closure(pc, pos == start, pos == end):
+            if visited[target] == pos:
+                continue
+
+            visited[target] = pos
+            if saves:
+                updated = list(captures)
+                for slot in saves:
+                    updated[slot] = pos
+
+                threads.append((target, tuple(updated)))
+
+            else:
+                threads.append((target, captures))
+
+    def search(self, encoding: List[int], condition_bits: List[int], start: int = 0, at_start=True, at_end=True) -> Optional[PatternMatch]:
+        """
+        Returns the leftmost match that starts at or after `start`.
+
+        `encoding` contains for each token a mask of the conditions it satisfies and `condition_bits` gives the bit of each
+        condition of this pattern in those masks. `^` matches before the first token only if `at_start` is true and `$` after
+        the last token only if `at_end` is true, ie. if the tokens begin or end the text.
+        """
+        length = len(encoding)
+        text_start = 0 if at_start else -1
+        text_end = length if at_end else -1
+        first_mask = None
+        if self.first_conditions is not None:
+            first_mask = sum(bit for i, bit in enumerate(condition_bits) if self.first_conditions >> i & 1)
+
+        program = self.program
+        visited = [-1] * len(program)
+        empty = (None,) * self.slot_count
+        threads: List[Tuple[int, tuple]] = []
+        matched = None
+        pos = start
+        while pos <= length:
+            if matched is None and (first_mask is None or pos == text_start or pos < length and encoding[pos] & first_mask):
+                self._add_threads(threads, visited, 0, empty, pos, text_start, text_end)
+
+            if not threads:
+                if matched is not None:
+                    break
+
+                pos += 1
+                continue
+
+            next_threads: List[Tuple[int, tuple]] = []
+            token = encoding[pos] if pos < length else 0
+            for pc, captures in threads:
+                instruction = program[pc]
+                if instruction[0] == MATCH:
+                    matched = captures
+                    break
+
+                if pos < length and (instruction[1] is None or token & condition_bits[instruction[1]]):
+                    self._add_threads(next_threads, visited, pc + 1, captures, pos + 1, text_start, text_end)
+
+            threads = next_threads
+            pos += 1
+
+        if matched is None:
+            return None
+
+        groups = {name: (matched[2*i], matched[2*i+1]) for name, i in self.groups.items() if matched[2*i] is not None}
+        return PatternMatch((matched[0], matched[1]), groups)
+
+    def finditer(self, encoding: List[int], condition_bits: List[int], overlapping=False, at_start=True, at_end=True) -> Iterator[PatternMatch]:
+        """
+        Yields the non-empty matches in order. Matches do not overlap unless `overlapping` is true.
+        """
+        start = 0
+        while start <= len(encoding):
+            m = self.search(encoding, condition_bits, start, at_start, at_end)
+            if m is None:
+                break
+
+            if m.span[0] < m.span[1]:
+                yield m
+
+            start = m.span[0] + 1 if overlapping or m.span[0] == m.span[1] else m.span[1]
@@ -1,4 +1,8 @@
-from typing import Dict, List, Literal, NamedTuple, Optional, Set, Tuple, TypedDict
+from collections.abc import Mapping
+import sys
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Literal, NamedTuple, Optional, Set, Tuple, TypedDict
+from . import bits
 from .tables import Person, Number
 
 # Morphological analysis
@@ -30,6 +34,124 @@ class Analysis(_AnalysisRequired, total=False):
     UNGRAMMATICAL: str
     SYNTAX_INFO: SyntaxInfo
 
+class CompactAnalysis(Mapping):
+    """
+    A read-only, memory-efficient form of `Analysis`. Strings are interned, lists are stored as tuples and dicts as read-only
+    mappings that are created once and shared by all lookups.
+
+    Supports the same keys as `Analysis` through the mapping interface, so `analysis["LEMMA"]` and `analysis.get("SUFFIX", {})` work as usual.
+    """
+
+    __slots__ = ("word", "pos", "xpos", "boqwiz_pos", "boqwiz_id", "parts", "lemma", "prefix", "suffix", "xpos_gsuff", "ungrammatical", "syntax_info", "_mask", "_mask_generation")
+
+    word: str
+    pos: str
+    xpos: Xpos
+    boqwiz_pos: str
+    boqwiz_id: str
+    parts: Tuple[str, ...]
+    lemma: str
+    prefix: Optional[str]
+    suffix: Optional[Mapping[str, str]]
+    xpos_gsuff: Optional[str]
+    ungrammatical: Optional[str]
+    syntax_info: Optional[SyntaxInfo]
+
+    _KEYS = {
+        "WORD": "word",
+        "POS": "pos",
+        "XPOS": "xpos",
+        "BOQWIZ_POS": "boqwiz_pos",
+        "BOQWIZ_ID": "boqwiz_id",
+        "PARTS": "parts",
+        "LEMMA": "lemma",
+        "PREFIX": "prefix",
+        "SUFFIX": "suffix",
+        "XPOS_GSUFF": "xpos_gsuff",
+        "UNGRAMMATICAL": "ungrammatical",
+        "SYNTAX_INFO": "syntax_info",
+    }
+
+    @staticmethod
+    def from_dict(analysis: Analysis) -> "CompactAnalysis":
+        intern = sys.intern
+        compact = CompactAnalysis()
+        compact.word = intern(analysis["WORD"])
+        compact.pos = intern(analysis["POS"])
+        compact.xpos = intern(analysis["XPOS"])
+        compact.boqwiz_pos = intern(analysis["BOQWIZ_POS"])
+        compact.boqwiz_id = intern(analysis["BOQWIZ_ID"])
+        compact.parts = tuple(intern(part) for part in analysis["PARTS"])
+        compact.lemma = intern(analysis["LEMMA"])
+        compact.prefix = intern(analysis["PREFIX"]) if "PREFIX" in analysis else None
+        compact.suffix = MappingProxyType({intern(key): intern(value) for key, value in analysis["SUFFIX"].items()}) if "SUFFIX" in analysis else None
+        compact.xpos_gsuff = intern(analysis["XPOS_GSUFF"]) if "XPOS_GSUFF" in analysis else None
+        compact.ungrammatical = intern(analysis["UNGRAMMATICAL"]) if "UNGRAMMATICAL" in analysis else None
+        if "SYNTAX_INFO" in analysis:
+            info = {key: frozenset(value) if isinstance(value, set) else value for key, value in analysis["SYNTAX_INFO"].items()}
+            compact.syntax_info = MappingProxyType(info)
+        
+        else:
+            compact.syntax_info = None
+        
+        compact._mask = 0
+        compact._mask_generation = -1
+        return compact
+
+    def bits_mask(self, compute: Callable[["CompactAnalysis"], int]) -> int:
+        """
+        Returns the registered syntax bits as an integer mask (see `yajwiz.bits`). The mask is computed with `compute` once per registry generation.
+        """
+        if self._mask_generation != bits.generation():
+            self._mask = compute(self)
+            self._mask_generation = bits.generation()
+        
+        return self._mask
+
+    def to_dict(self) -> Analysis:
+        """
+        Returns a mutable copy of the analysis.
+        """
+        analysis = dict(self)
+        analysis["PARTS"] = list(self.parts)
+        if self.suffix is not None:
+            analysis["SUFFIX"] = dict(self.suffix)
+        
+        if self.syntax_info is not None:
+            analysis["SYNTAX_INFO"] = {key: set(value) if isinstance(value, frozenset) else value for key, value in self.syntax_info.items()}
+        
+        return analysis
+
+    def __getitem__(self, key: str):
+        value = getattr(self, self._KEYS[key], None)
+        if value is None:
+            raise KeyError(key)
+        
+        return value
+
+    # Read-only mappings cannot be pickled, so they are pickled as dicts
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in CompactAnalysis.__slots__}
+        for name in ("suffix", "syntax_info"):
+            if state[name] is not None:
+                state[name] = dict(state[name])
+        
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, MappingProxyType(value) if name in ("suffix", "syntax_info") and value is not None else value)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, attribute in self._KEYS.items() if getattr(self, attribute) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"CompactAnalysis({dict(self)!r})"
+
 TokenType = Literal["WORD", "SPACE", "PUNCT"]
 
 class Token(NamedTuple):